@@ -0,0 +1,272 @@
+"""
+Batch PNR Checks
+Streams PNR numbers from a CSV/JSONL file or stdin, checks them with a
+PNRRunner and appends one JSON line per PNR to an output file as soon as
+its check finishes. A checkpoint file tracks which input records are done,
+so an interrupted run resumes where it stopped.
+"""
+
+import csv
+import json
+import os
+import sys
+import time
+
+
+PNR_FIELDS = ('pnr', 'pnr_number', 'PNR')
+
+# Record statuses that are final; 'failed' and 'error' records are checked
+# again when the run is resumed
+FINAL_STATUSES = ('ok', 'cached', 'invalid')
+
+
+def is_valid_pnr(pnr_number):
+    return len(pnr_number) == 10 and pnr_number.isdigit()
+
+
+def _pnr_from_json(line):
+    value = json.loads(line)
+    if isinstance(value, dict):
+        for field in PNR_FIELDS:
+            if field in value:
+                return str(value[field])
+        return ''
+    return str(value)
+
+
+def read_pnrs(source, fmt=None):
+    """
+    Yield (index, pnr_number) for every record of source, one line at a time
+
+    source is a path or '-' for stdin. fmt is 'csv' or 'jsonl' (default: from
+    the file extension, csv for stdin). CSV input uses a pnr/pnr_number column
+    when the first row is a header, otherwise the first column - so a plain
+    list of PNRs, one per line, works too. JSONL lines are objects with a
+    pnr/pnr_number field or bare strings/numbers. index counts records, not
+    lines, and is the same on every read of the same input.
+    """
+    if fmt is None:
+        ext = os.path.splitext(source)[1].lower()
+        fmt = 'jsonl' if ext in ('.jsonl', '.ndjson', '.json') else 'csv'
+    f = sys.stdin if source == '-' else open(source, 'r', encoding='utf-8', newline='')
+    try:
+        index = 0
+        if fmt == 'jsonl':
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    pnr_number = _pnr_from_json(line)
+                except ValueError:
+                    pnr_number = line
+                yield index, pnr_number.strip()
+                index += 1
+            return
+
+        column = 0
+        for row_number, row in enumerate(csv.reader(f)):
+            if not row or not any(cell.strip() for cell in row):
+                continue
+            if row_number == 0:
+                header = [cell.strip() for cell in row]
+                names = [field for field in PNR_FIELDS if field in header]
+                if names:
+                    column = header.index(names[0])
+                    continue
+                if not header[0].isdigit():
+                    continue  # some other header row
+            yield index, row[column].strip() if column < len(row) else ''
+            index += 1
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+class Checkpoint:
+    def __init__(self, path, save_every=50, save_interval=5.0):
+        """
+        Track processed input records in a small JSON file at path
+
+        The file holds a watermark (every record below it is processed), the
+        processed records above it (at most one runner window of them), the
+        processed records whose check failed (to be retried), and how much
+        of the output file those cover. Saved every save_every records or
+        save_interval seconds, and on close.
+        """
+        self.path = path
+        self.save_every = save_every
+        self.save_interval = save_interval
+        self.watermark = 0
+        self.ahead = set()
+        self.failed = set()
+        self.output_offset = 0
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.watermark = state.get('watermark', 0)
+            self.ahead = set(state.get('ahead', []))
+            self.failed = set(state.get('failed', []))
+            self.output_offset = state.get('output_offset', 0)
+
+    def is_done(self, index):
+        """True if record index was processed and its check did not fail"""
+        return (index < self.watermark or index in self.ahead) and index not in self.failed
+
+    def mark_done(self, index, output_offset=None, final=True):
+        """
+        Record that input record index was processed
+        final=False (a failed check) keeps it due for the next run
+        """
+        if final:
+            self.failed.discard(index)
+        else:
+            self.failed.add(index)
+        if index >= self.watermark:
+            self.ahead.add(index)
+        while self.watermark in self.ahead:
+            self.ahead.remove(self.watermark)
+            self.watermark += 1
+        if output_offset is not None:
+            self.output_offset = output_offset
+        self._unsaved += 1
+        if self._unsaved >= self.save_every or time.monotonic() - self._saved_at >= self.save_interval:
+            self.save()
+
+    def save(self):
+        """Write the checkpoint atomically"""
+        state = {
+            'watermark': self.watermark,
+            'ahead': sorted(self.ahead),
+            'failed': sorted(self.failed),
+            'output_offset': self.output_offset,
+            'saved_at': time.time(),
+        }
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+
+
+class ResultWriter:
+    def __init__(self, path, checkpoint):
+        """
+        Append JSON lines to path, resuming after the records in checkpoint
+
+        Lines written after the last checkpoint save are read back so their
+        records are not checked twice; a line cut off by a crash is dropped.
+        """
+        self.checkpoint = checkpoint
+        self.written = 0
+        mode = 'r+b' if os.path.exists(path) else 'w+b'
+        self._file = open(path, mode)
+        self._file.seek(min(checkpoint.output_offset, os.path.getsize(path)))
+        end = self._file.tell()
+        for line in self._file:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                record = json.loads(line)
+                checkpoint.mark_done(record['index'], final=record.get('status') in FINAL_STATUSES)
+            except (ValueError, KeyError):
+                pass
+            end += len(line)
+        self._file.seek(end)
+        self._file.truncate()
+        checkpoint.output_offset = end
+
+    def write(self, index, pnr_number, status, result=None, error=None, seconds=None, timings=None):
+        """Write one record and mark its input record processed"""
+        record = {
+            'index': index,
+            'pnr': pnr_number,
+            'status': status,
+            'ok': status in ('ok', 'cached'),
+            'error': error,
+            'seconds': None if seconds is None else round(seconds, 3),
+            'timings': {stage: round(value, 3) for stage, value in (timings or {}).items()},
+            'checked_at': round(time.time(), 3),
+            'result': result,
+        }
+        self._file.write((json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8'))
+        self._file.flush()
+        self.written += 1
+        self.checkpoint.mark_done(index, self._file.tell(), final=status in FINAL_STATUSES)
+
+    def close(self):
+        self._file.close()
+        self.checkpoint.save()
+
+
+def run_batch(runner, source, output_path, checkpoint_path=None, fmt=None, max_pending=None,
+              on_result=None, cache=None, metrics=None, circuit_breaker=None):
+    """
+    Check every PNR of source and append the results to output_path
+
+    runner      - PNRRunner doing the checks
+    on_result   - called with each runner outcome (cache, history, emails)
+    cache       - optional ResultCache; fresh results are written without a check
+    metrics     - optional Metrics; each record gets its PNR's stage timings
+    circuit_breaker - optional CircuitBreaker of the site; no further input
+                  is read while it blocks requests, so an outage fails at
+                  most the records already in flight
+    Records whose check failed are written but retried on the next run.
+    Returns a dict of counts per record status
+    """
+    checkpoint_path = checkpoint_path or output_path + '.checkpoint'
+    if os.path.exists(checkpoint_path) and not os.path.exists(output_path):
+        print(f"ℹ️ {output_path} is gone, ignoring checkpoint {checkpoint_path}")
+        os.remove(checkpoint_path)
+    checkpoint = Checkpoint(checkpoint_path)
+    writer = ResultWriter(output_path, checkpoint)
+    counts = {'ok': 0, 'failed': 0, 'error': 0, 'invalid': 0, 'cached': 0, 'skipped': 0}
+    if checkpoint.watermark or checkpoint.ahead:
+        print(f"Resuming {source} after {checkpoint.watermark} processed record(s), "
+              f"retrying {len(checkpoint.failed)} failed")
+
+    def wait_for_site():
+        """Hold back input while the circuit breaker would reject requests"""
+        if not circuit_breaker or not circuit_breaker.blocked():
+            return
+        print(f"⏸ Site unavailable, pausing input (next probe in {circuit_breaker.retry_in():.0f}s)")
+        while circuit_breaker.blocked():
+            time.sleep(min(5.0, max(0.2, circuit_breaker.retry_in())))
+        print("▶ Resuming input")
+
+    def to_check():
+        """Input records still to be checked; the rest are written here directly"""
+        for index, pnr_number in read_pnrs(source, fmt):
+            if checkpoint.is_done(index):
+                counts['skipped'] += 1
+                continue
+            if not is_valid_pnr(pnr_number):
+                counts['invalid'] += 1
+                writer.write(index, pnr_number, 'invalid', error="not a 10-digit PNR number")
+                continue
+            cached = cache.get(pnr_number) if cache else None
+            if cached:
+                counts['cached'] += 1
+                writer.write(index, pnr_number, 'cached', result=cached)
+                continue
+            wait_for_site()
+            yield index, pnr_number
+
+    start = time.perf_counter()
+    try:
+        for (index, pnr_number), outcome in runner.stream(to_check(), on_result=on_result,
+                                                          key=lambda item: item[1], max_pending=max_pending):
+            status = 'error' if outcome['error'] else 'ok' if outcome['result'] else 'failed'
+            counts[status] += 1
+            timings = metrics.pop_pnr_summary(pnr_number) if metrics else None
+            writer.write(index, pnr_number, status, outcome['result'], outcome['error'],
+                         outcome.get('seconds'), timings)
+    finally:
+        writer.close()
+        elapsed = time.perf_counter() - start
+        print(f"\nBatch: {writer.written} record(s) written to {output_path} in {elapsed:.1f}s - "
+              + ', '.join(f"{count} {status}" for status, count in counts.items() if count))
+    return counts
@@ -0,0 +1,263 @@
+"""
+PNR Checker Benchmark
+Runs PNRChecker and EmailNotifier against local stand-ins (the mock enquiry
+site and a null SMTP server) and reports PNRs/minute, p50/p95 latency and
+memory per worker.
+
+    python -m bench.benchmark --pnrs 200 --workers 1 4 8 --latency 0.05
+    python -m bench.benchmark --backend browser --pnrs 20 --workers 2
+"""
+
+import argparse
+import base64
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.mock_site import MockEnquirySite, pnr_record, render_captcha
+from captcha_solver import TemplateCaptchaSolver
+from driver_pool import DriverPool
+from email_notifier import EmailNotifier
+from http_client import PNRHttpClient
+from metrics import Metrics, percentile
+from pnr_checker import PNRChecker
+from pnr_parser import parse_result_json
+from pnr_runner import PNRRunner
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Expressions covering every glyph the mock site draws
+TRAINING_EXPRESSIONS = ['01+23=?', '45-67=?', '89+01=?']
+
+
+def sample_pnrs(count):
+    return [str(2200000000 + n * 7919) for n in range(count)]
+
+
+def build_solver(templates_dir):
+    """Template solver trained on the mock site's CAPTCHA font"""
+    solver = TemplateCaptchaSolver(templates_dir)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for expression in TRAINING_EXPRESSIONS:
+            solver.learn(base64.b64encode(render_captcha(expression)).decode('utf-8'), expression)
+    return solver
+
+
+def max_rss_mb():
+    """Peak resident set size of this process in MB, or None if unavailable"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def _latency_stats(durations):
+    return {
+        'p50_seconds': round(percentile(durations, 0.50), 4),
+        'p95_seconds': round(percentile(durations, 0.95), 4),
+    }
+
+
+def bench_checker(site, solver, backend, pnr_numbers, workers, quiet=True):
+    """Check pnr_numbers against the mock site with the given concurrency"""
+    metrics = Metrics()
+    driver_pool = None
+    http_client = None
+    if backend == 'http':
+        http_client = PNRHttpClient(solver, base_url=site.base_url + '/enquiry/', pool_size=workers)
+    else:
+        driver_pool = DriverPool(PNRChecker(None, captcha_solver=solver).create_driver, size=workers)
+
+    runner = PNRRunner(
+        lambda: PNRChecker(
+            None,
+            driver_pool=driver_pool,
+            timing_profile='fast',
+            captcha_solver=solver,
+            http_client=http_client,
+            metrics=metrics,
+            browser_fallback=backend != 'http',
+            enquiry_url=site.enquiry_url
+        ),
+        max_concurrency=workers
+    )
+
+    rss_before = max_rss_mb()
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        output = io.StringIO() if quiet else sys.stdout
+        with contextlib.redirect_stdout(output):
+            outcomes = runner.run(pnr_numbers)
+    finally:
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if driver_pool:
+            driver_pool.close()
+    rss_after = max_rss_mb()
+
+    durations = metrics.durations('check_pnr')
+    ok = sum(1 for outcome in outcomes if outcome['result'])
+    report = {
+        'benchmark': f'checker_{backend}',
+        'workers': workers,
+        'pnrs': len(pnr_numbers),
+        'ok': ok,
+        'failed': len(pnr_numbers) - ok,
+        'seconds': round(elapsed, 3),
+        'pnrs_per_minute': round(len(pnr_numbers) / elapsed * 60, 1) if elapsed else 0.0,
+        'python_heap_mb_per_worker': round(peak / workers / (1024 * 1024), 3),
+    }
+    report.update(_latency_stats(durations))
+    if rss_before is not None:
+        report['rss_growth_mb_per_worker'] = round((rss_after - rss_before) / workers, 2)
+    return report
+
+
+class NullSMTP:
+    """SMTP stand-in that accepts and discards every message"""
+
+    def __init__(self):
+        self.sent = 0
+        self.bytes = 0
+
+    def send_message(self, message):
+        self.sent += 1
+        self.bytes += len(message.as_bytes())
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class BenchmarkNotifier(EmailNotifier):
+    """EmailNotifier delivering into a NullSMTP instead of a real server"""
+
+    def __init__(self, digest=False):
+        super().__init__(digest=digest)
+        self.sender_email = 'bench@example.com'
+        self.sender_password = 'unused'
+        self.receiver_email = 'bench@example.com'
+        self.sink = NullSMTP()
+
+    def _connect(self):
+        self._server = self.sink
+        return self.sink
+
+
+def bench_notifier(pnr_numbers, digest=False, quiet=True):
+    """Time rendering and MIME-encoding one status email per PNR"""
+    notifier = BenchmarkNotifier(digest=digest)
+    results = [parse_result_json(pnr_record(pnr)) for pnr in pnr_numbers]
+    changes = [{'type': 'new', 'passenger_no': '', 'old': '', 'new': ''}]
+
+    durations = []
+    tracemalloc.start()
+    start = time.perf_counter()
+    output = io.StringIO() if quiet else sys.stdout
+    with contextlib.redirect_stdout(output):
+        for pnr_number, result in zip(pnr_numbers, results):
+            began = time.perf_counter()
+            notifier.send_pnr_status(pnr_number, result['journey_details'],
+                                     result['passenger_details'], changes)
+            durations.append(time.perf_counter() - began)
+        if digest:
+            notifier.send_digest()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    report = {
+        'benchmark': 'email_digest' if digest else 'email',
+        'workers': 1,
+        'pnrs': len(pnr_numbers),
+        'emails': notifier.sink.sent,
+        'email_kb': round(notifier.sink.bytes / 1024, 1),
+        'seconds': round(elapsed, 3),
+        'pnrs_per_minute': round(len(pnr_numbers) / elapsed * 60, 1) if elapsed else 0.0,
+        'python_heap_mb_per_worker': round(peak / (1024 * 1024), 3),
+    }
+    report.update(_latency_stats(durations))
+    return report
+
+
+def print_report(report):
+    line = (f"{report['benchmark']:<16}{report['workers']:>8}{report['pnrs']:>7}"
+            f"{report['pnrs_per_minute']:>12.1f}{report['p50_seconds']:>9.3f}s{report['p95_seconds']:>9.3f}s"
+            f"{report['python_heap_mb_per_worker']:>11.2f}")
+    rss = report.get('rss_growth_mb_per_worker')
+    line += f"{rss:>11.2f}" if rss is not None else f"{'-':>11}"
+    if report.get('failed'):
+        line += f"   ({report['failed']} failed)"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PNRChecker and EmailNotifier against a local mock site")
+    parser.add_argument('--backend', choices=['http', 'browser'], default='http')
+    parser.add_argument('--pnrs', type=int, default=100, help="PNRs per run")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4], help="concurrency levels to run")
+    parser.add_argument('--latency', type=float, default=0.02, help="mock site latency per response (seconds)")
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--captcha-reject-rate', type=float, default=0.0)
+    parser.add_argument('--skip-email', action='store_true', help="only benchmark the checker")
+    parser.add_argument('--verbose', action='store_true', help="show the checker's own output")
+    parser.add_argument('--json', metavar='PATH', help="also write the reports as JSON lines")
+    args = parser.parse_args()
+
+    site = MockEnquirySite(latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate,
+                           captcha_reject_rate=args.captcha_reject_rate, seed=1).start()
+    pnr_numbers = sample_pnrs(args.pnrs)
+    reports = []
+    print(f"Mock enquiry site at {site.enquiry_url}")
+    print(f"\n{'Benchmark':<16}{'Workers':>8}{'PNRs':>7}{'PNRs/min':>12}{'p50':>10}{'p95':>10}"
+          f"{'Heap MB/w':>11}{'RSS MB/w':>11}")
+    print("-" * 85)
+
+    try:
+        with tempfile.TemporaryDirectory() as templates_dir:
+            solver = build_solver(templates_dir)
+            for workers in args.workers:
+                try:
+                    report = bench_checker(site, solver, args.backend, pnr_numbers, workers,
+                                           quiet=not args.verbose)
+                except Exception as e:
+                    print(f"❌ Checker benchmark with {workers} worker(s) failed: {e}")
+                    continue
+                reports.append(report)
+                print_report(report)
+
+        if not args.skip_email:
+            for digest in (False, True):
+                report = bench_notifier(pnr_numbers, digest=digest, quiet=not args.verbose)
+                reports.append(report)
+                print_report(report)
+    finally:
+        site.stop()
+
+    print(f"\nMock site: {site.stats}")
+    if args.json:
+        with open(args.json, 'a', encoding='utf-8') as f:
+            for report in reports:
+                f.write(json.dumps(report) + '\n')
+        print(f"Reports written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Mock PNR Enquiry Site
+Local stand-in for the Indian Railways enquiry pages used for benchmarking.
+Serves the same element IDs as the real page, draws math CAPTCHAs with PIL,
+answers the CommonCaptcha endpoint in the real JSON shape, and can inject
+latency and failures.
+
+Run standalone:
+    python -m bench.mock_site --port 8765 --latency 0.05 --failure-rate 0.02
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import urlparse, parse_qs
+from PIL import Image, ImageDraw, ImageFont
+
+
+PAGE_PATH = '/enquiry/PNR/PnrEnquiry.html'
+CAPTCHA_PATH = '/enquiry/captchaDraw.png'
+SUBMIT_PATH = '/enquiry/CommonCaptcha'
+
+PAGE_HTML = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>PNR Enquiry (mock)</title></head>
+<body>
+  <input id="inputPnrNo" type="text" maxlength="10">
+  <button id="modal1" type="button">Submit</button>
+
+  <div id="firstCaptcha" style="display: none;">
+    <img id="CaptchaImgID" src="" alt="captcha">
+    <input id="inputCaptcha" type="text">
+    <button id="submitPnrNo" type="button">Submit</button>
+    <div id="captchaError"></div>
+  </div>
+
+  <div id="results" style="display: none;">
+    <table id="journeyDetailsTable">
+      <thead><tr><th>Train Number</th><th>Train Name</th><th>Boarding Date</th><th>From</th>
+      <th>To</th><th>Reserved Upto</th><th>Boarding Point</th><th>Class</th></tr></thead>
+      <tbody></tbody>
+    </table>
+    <table id="psgnDetailsTable">
+      <thead><tr><th>S. No.</th><th>Booking Status</th><th>Current Status</th><th>Coach Position</th></tr></thead>
+      <tbody></tbody>
+    </table>
+  </div>
+
+  <script>
+    function $(id) { return document.getElementById(id); }
+    function loadCaptcha() { $('CaptchaImgID').src = '/enquiry/captchaDraw.png?' + Date.now(); }
+    function cell(text) { var td = document.createElement('td'); td.textContent = text; return td; }
+    function row(cells) { var tr = document.createElement('tr'); cells.forEach(function (c) { tr.appendChild(cell(c)); }); return tr; }
+
+    $('modal1').onclick = function () {
+      $('firstCaptcha').style.display = 'block';
+      loadCaptcha();
+    };
+
+    $('submitPnrNo').onclick = function () {
+      var query = 'inputCaptcha=' + encodeURIComponent($('inputCaptcha').value) +
+                  '&inputPnrNo=' + encodeURIComponent($('inputPnrNo').value) +
+                  '&inputPage=PNR&language=en';
+      fetch('/enquiry/CommonCaptcha?' + query).then(function (r) { return r.json(); }).then(function (d) {
+        if (d.errorMessage) {
+          $('captchaError').textContent = d.errorMessage;
+          $('inputCaptcha').value = '';
+          loadCaptcha();
+          return;
+        }
+        $('firstCaptcha').style.display = 'none';
+        $('journeyDetailsTable').tBodies[0].appendChild(row([
+          d.trainNumber, d.trainName, d.dateOfJourney, d.sourceStation,
+          d.destinationStation, d.reservationUpto, d.boardingPoint, d.journeyClass
+        ]));
+        d.passengerList.forEach(function (p) {
+          $('psgnDetailsTable').tBodies[0].appendChild(row([
+            'Passenger ' + p.passengerSerialNumber, p.bookingStatusDetails,
+            p.currentStatusDetails, p.currentCoachId || ''
+          ]));
+        });
+        $('results').style.display = 'block';
+      });
+    };
+  </script>
+</body>
+</html>
+"""
+
+STATIONS = ['NDLS', 'HWH', 'BCT', 'MAS', 'SBC', 'ASR', 'LKO', 'PNBE', 'JP', 'ADI']
+TRAINS = ['RAJDHANI EXP', 'SHATABDI EXP', 'DURONTO EXP', 'JANSHATABDI', 'GARIB RATH', 'MAIL']
+CLASSES = ['1A', '2A', '3A', 'SL', 'CC', '2S']
+
+
+def _font(size=24):
+    """PIL's built-in font at the given size (Pillow >= 10.1), or the bitmap default"""
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def render_captcha(expression, size=(160, 40)):
+    """Draw a CAPTCHA expression such as '12+7=?' and return PNG bytes"""
+    img = Image.new('L', size, 230)
+    ImageDraw.Draw(img).text((5, 5), expression, fill=20, font=_font())
+    buffer = BytesIO()
+    img.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def random_expression(rng):
+    """Pick a math CAPTCHA and its answer; answers are never negative"""
+    a, b = rng.randint(0, 99), rng.randint(0, 99)
+    if rng.random() < 0.5:
+        return f"{a}+{b}=?", str(a + b)
+    a, b = max(a, b), min(a, b)
+    return f"{a}-{b}=?", str(a - b)
+
+
+def pnr_record(pnr_number):
+    """Deterministic fake booking for a PNR, in the enquiry endpoint's JSON shape"""
+    rng = random.Random(pnr_number)
+    source, destination = rng.sample(STATIONS, 2)
+    journey_date = date.today() + timedelta(days=rng.randint(-3, 60))
+    passengers = []
+    for serial in range(1, rng.randint(1, 6) + 1):
+        booking = rng.randint(1, 80)
+        kind = rng.choice(['CNF', 'RAC', 'WL'])
+        if kind == 'CNF':
+            current, coach = 'CNF', f"B{rng.randint(1, 9)}"
+        else:
+            current, coach = f"{kind}/{rng.randint(1, booking)}", ''
+        passengers.append({
+            'passengerSerialNumber': serial,
+            'bookingStatusDetails': f"WL/{booking}/GNWL",
+            'currentStatusDetails': current,
+            'currentCoachId': coach,
+        })
+    return {
+        'trainNumber': str(rng.randint(12001, 22999)),
+        'trainName': rng.choice(TRAINS),
+        'dateOfJourney': journey_date.strftime('%d-%m-%Y'),
+        'sourceStation': source,
+        'destinationStation': destination,
+        'reservationUpto': destination,
+        'boardingPoint': source,
+        'journeyClass': rng.choice(CLASSES),
+        'passengerList': passengers,
+    }
+
+
+class MockEnquirySite:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0,
+                 failure_rate=0.0, captcha_reject_rate=0.0, seed=None):
+        """
+        Configure the mock site
+
+        latency/jitter      - seconds added to every dynamic response (base + uniform jitter)
+        failure_rate        - share of page/submit requests answered with HTTP 503
+        captcha_reject_rate - share of correct CAPTCHA answers rejected anyway
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.captcha_reject_rate = captcha_reject_rate
+        self.rng = random.Random(seed)
+        self.answers = {}
+        self.stats = {'pages': 0, 'captchas': 0, 'submits': 0, 'rejected': 0, 'failures': 0}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def enquiry_url(self):
+        return self.base_url + PAGE_PATH + '?locale=en'
+
+    def start(self):
+        """Serve in a background thread and return self"""
+        self._thread = threading.Thread(target=self.server.serve_forever, name='mock-site', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _chance(self, rate):
+        with self._lock:
+            return rate > 0 and self.rng.random() < rate
+
+    def _delay(self):
+        if self.latency or self.jitter:
+            with self._lock:
+                extra = self.rng.uniform(0, self.jitter) if self.jitter else 0.0
+            time.sleep(self.latency + extra)
+
+    def _handler_class(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _session(self):
+                for part in self.headers.get('Cookie', '').split(';'):
+                    name, _, value = part.strip().partition('=')
+                    if name == 'JSESSIONID' and value:
+                        return value, False
+                return uuid.uuid4().hex, True
+
+            def _send(self, status, content_type, body, session=None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('Cache-Control', 'no-store')
+                if session:
+                    self.send_header('Set-Cookie', f"JSESSIONID={session}; Path=/")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                session, new_session = self._session()
+                cookie = session if new_session else None
+
+                if url.path == PAGE_PATH:
+                    site._delay()
+                    if site._chance(site.failure_rate):
+                        site._count('failures')
+                        return self._send(503, 'text/plain', b'Service Unavailable')
+                    site._count('pages')
+                    return self._send(200, 'text/html; charset=utf-8', PAGE_HTML.encode('utf-8'), cookie)
+
+                if url.path == CAPTCHA_PATH:
+                    site._delay()
+                    with site._lock:
+                        expression, answer = random_expression(site.rng)
+                        site.answers[session] = answer
+                    site._count('captchas')
+                    return self._send(200, 'image/png', render_captcha(expression), cookie)
+
+                if url.path == SUBMIT_PATH:
+                    site._delay()
+                    if site._chance(site.failure_rate):
+                        site._count('failures')
+                        return self._send(503, 'text/plain', b'Service Unavailable')
+                    site._count('submits')
+                    params = parse_qs(url.query)
+                    answer = params.get('inputCaptcha', [''])[0]
+                    pnr_number = params.get('inputPnrNo', [''])[0]
+                    with site._lock:
+                        expected = site.answers.pop(session, None)
+                    if answer != expected or site._chance(site.captcha_reject_rate):
+                        site._count('rejected')
+                        body = {'flag': 'ERROR', 'errorMessage': 'Captcha not matched'}
+                    else:
+                        body = dict(pnr_record(pnr_number), flag='NO_ERROR')
+                    return self._send(200, 'application/json', json.dumps(body).encode('utf-8'), cookie)
+
+                self._send(404, 'text/plain', b'Not Found')
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local mock of the PNR enquiry site")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random latency up to this many seconds")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument('--captcha-reject-rate', type=float, default=0.0, help="share of correct answers rejected")
+    args = parser.parse_args()
+
+    site = MockEnquirySite(args.host, args.port, args.latency, args.jitter,
+                           args.failure_rate, args.captcha_reject_rate)
+    print(f"Mock enquiry site at {site.enquiry_url}")
+    try:
+        site.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site.server.server_close()
+        print(f"Stats: {site.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+CAPTCHA Answer Cache
+Persistent sqlite cache of verified CAPTCHA answers keyed by a perceptual
+hash of the image, bounded with least-recently-used eviction. The site
+draws its CAPTCHAs from a small generator space, so repeated images can be
+answered without calling a solver.
+"""
+
+import base64
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+from PIL import Image
+from captcha_solver import CaptchaSolver
+
+
+# Hash grid: fine enough that CAPTCHAs differing in one digit stay many
+# bits apart (coarser grids blur e.g. 88-65 and 86-85 into the same hash)
+HASH_SIZE = (96, 24)
+
+
+def image_hash(image_base64):
+    """
+    Average hash of a base64 image as an int of HASH_SIZE bits
+    Each bit is one cell of the downscaled image that is darker than the mean
+    """
+    img = Image.open(BytesIO(base64.b64decode(image_base64))).convert('L')
+    pixels = img.resize(HASH_SIZE, Image.BILINEAR).tobytes()
+    mean = sum(pixels) / len(pixels)
+    return int(''.join('1' if value < mean else '0' for value in pixels), 2)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class CaptchaAnswerCache:
+    def __init__(self, path='captcha_cache.db', max_entries=5000, max_distance=3):
+        """
+        Open (or create) the cache database at path
+
+        max_entries  - least recently used answers are evicted beyond this
+        max_distance - hashes differing in at most this many bits count as
+                       the same image (0 = exact matches only)
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0, 'evicted': 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS captcha_answers (
+                image_hash TEXT PRIMARY KEY,
+                answer     TEXT NOT NULL,
+                hits       INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                last_used  REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+        # hash -> answer, least recently used first
+        self._entries = OrderedDict()
+        for key, answer in self._conn.execute(
+                "SELECT image_hash, answer FROM captcha_answers ORDER BY last_used"):
+            self._entries[int(key, 16)] = answer
+        self._evict()
+        self._conn.commit()
+
+    def _find(self, key):
+        """Exact or nearest cached hash within max_distance, or None"""
+        if key in self._entries:
+            return key
+        best, best_distance = None, self.max_distance + 1
+        if self.max_distance:
+            for cached in self._entries:
+                distance = hamming(key, cached)
+                if distance < best_distance:
+                    best, best_distance = cached, distance
+        return best
+
+    @staticmethod
+    def _key(image_base64):
+        """image_hash of the image, or None if it is not an image (e.g. an error page)"""
+        try:
+            return image_hash(image_base64)
+        except Exception as e:
+            print(f"Could not hash CAPTCHA for the answer cache: {e}")
+            return None
+
+    def get(self, image_base64):
+        """Return the verified answer for this image, or None"""
+        key = self._key(image_base64)
+        with self._lock:
+            if key is None:
+                self.stats['misses'] += 1
+                return None
+            match = self._find(key)
+            if match is None:
+                self.stats['misses'] += 1
+                return None
+            self.stats['hits'] += 1
+            self._entries.move_to_end(match)
+            self._conn.execute(
+                "UPDATE captcha_answers SET hits = hits + 1, last_used = ? WHERE image_hash = ?",
+                (time.time(), format(match, 'x'))
+            )
+            self._conn.commit()
+            return self._entries[match]
+
+    def put(self, image_base64, answer):
+        """Record an answer the site accepted for this image"""
+        key = self._key(image_base64)
+        if key is None:
+            return
+        now = time.time()
+        with self._lock:
+            self._entries[key] = answer
+            self._entries.move_to_end(key)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO captcha_answers (image_hash, answer, hits, created_at, last_used) "
+                "VALUES (?, ?, 0, ?, ?)",
+                (format(key, 'x'), answer, now, now)
+            )
+            self.stats['stored'] += 1
+            self._evict()
+            self._conn.commit()
+
+    def invalidate(self, image_base64):
+        """Forget the answer cached for this image (e.g. after the site rejected it)"""
+        key = self._key(image_base64)
+        if key is None:
+            return
+        with self._lock:
+            match = self._find(key)
+            if match is None:
+                return
+            del self._entries[match]
+            self._conn.execute("DELETE FROM captcha_answers WHERE image_hash = ?", (format(match, 'x'),))
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries beyond max_entries (lock held)"""
+        while len(self._entries) > self.max_entries:
+            key, _ = self._entries.popitem(last=False)
+            self._conn.execute("DELETE FROM captcha_answers WHERE image_hash = ?", (format(key, 'x'),))
+            self.stats['evicted'] += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+
+class CachedCaptchaSolver(CaptchaSolver):
+    """
+    Answer repeated CAPTCHAs from a CaptchaAnswerCache and ask the wrapped
+    solver otherwise. Only answers the site accepted are cached.
+    """
+    name = 'cache'
+
+    def __init__(self, solver, cache):
+        super().__init__()
+        self.solver = solver
+        self.cache = cache
+        # One table for cache hits and the wrapped solvers
+        self.stats = solver.stats
+
+    def solve(self, image_base64):
+        answer, confidence, _ = self.solve_tracked(image_base64)
+        return answer, confidence
+
+    def solve_tracked(self, image_base64):
+        start = time.perf_counter()
+        answer = self.cache.get(image_base64)
+        if answer:
+            self.stats.record_attempt(self.name, time.perf_counter() - start, True)
+            print(f"CAPTCHA answered from cache: {answer}")
+            return answer, 1.0, self.name
+        return self.solver.solve_tracked(image_base64)
+
+    def report(self, source, correct, image_base64=None, answer=None):
+        if source != self.name:
+            self.solver.report(source, correct, image_base64, answer)
+            if correct and image_base64 and answer:
+                self.cache.put(image_base64, answer)
+            return
+        self.stats.record_verdict(self.name, correct)
+        if not correct and image_base64:
+            self.cache.invalidate(image_base64)
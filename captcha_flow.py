@@ -0,0 +1,159 @@
+"""
+CAPTCHA State Machine
+Drives the CAPTCHA modal of one PNR check in the browser:
+
+    LOAD -> SOLVE -> SUBMIT -> VERIFY -> ACCEPTED
+      ^                          |
+      +------- REFRESH <---------+
+
+A rejection is detected as soon as the site shows an error or swaps the
+image. If the new image is already loaded, solving it starts in the
+background while the rejected attempt is cleaned up; otherwise a new image
+is requested right away instead of waiting for the site to swap it. A
+failed capture or solve refreshes only the CAPTCHA image, not the whole
+page. Each rejected answer counts as exactly one attempt.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from selenium.common.exceptions import TimeoutException
+
+
+LOAD = 'load'
+SOLVE = 'solve'
+SUBMIT = 'submit'
+VERIFY = 'verify'
+REFRESH = 'refresh'
+ACCEPTED = 'accepted'
+FAILED = 'failed'
+
+
+class CaptchaFlow:
+    def __init__(self, checker, pnr_number, max_attempts=3):
+        """
+        Prepare the state machine
+
+        checker      - PNRChecker with the CAPTCHA modal already open
+        max_attempts - failed captures, failed solves and rejected answers
+                       allowed before giving up
+        """
+        self.checker = checker
+        self.pnr_number = pnr_number
+        self.max_attempts = max_attempts
+        self.attempts = 0
+        self.state = LOAD
+        self.previous_src = None
+        self.pending = None
+        self.image = None
+        self.answer = None
+        self.source = None
+        self.baseline = None
+        self._executor = None
+
+    def run(self):
+        """Run until the answer is accepted or attempts run out; returns True if accepted"""
+        handlers = {
+            LOAD: self._load,
+            SOLVE: self._solve,
+            SUBMIT: self._submit,
+            VERIFY: self._verify,
+            REFRESH: self._refresh,
+        }
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='captcha') as self._executor:
+            while self.state not in (ACCEPTED, FAILED):
+                self.state = handlers[self.state]()
+        if self.state == FAILED:
+            print("Failed to solve CAPTCHA after maximum retries")
+        return self.state == ACCEPTED
+
+    def _span(self, stage):
+        return self.checker.metrics.span(stage, self.pnr_number)
+
+    def _failed_attempt(self, message, next_state):
+        """Count a failed attempt and move on, or give up"""
+        print(message)
+        self.attempts += 1
+        return FAILED if self.attempts >= self.max_attempts else next_state
+
+    def _start_solving(self, image_base64):
+        """Solve image_base64 on the background thread"""
+        self.image = image_base64
+        self.pending = self._executor.submit(self.checker.captcha_solver.solve_tracked, image_base64)
+
+    def _load(self):
+        """Wait for a fresh CAPTCHA image, capture it and start solving it"""
+        print(f"Attempt {self.attempts + 1} to solve CAPTCHA...")
+        try:
+            with self._span('captcha_capture'):
+                self.checker.wait_for_captcha_image(self.previous_src)
+                image_base64 = self.checker.capture_captcha_image()
+        except TimeoutException:
+            return self._failed_attempt("CAPTCHA image did not load in time", REFRESH)
+
+        if not image_base64:
+            return self._failed_attempt("Failed to capture CAPTCHA image", REFRESH)
+        self._start_solving(image_base64)
+        return SOLVE
+
+    def _solve(self):
+        """Wait for the background solve to finish"""
+        with self._span('captcha_solve'):
+            answer, _, source = self.pending.result()
+        self.pending = None
+        if not answer:
+            return self._failed_attempt("Failed to solve CAPTCHA", REFRESH)
+        self.answer, self.source = answer, source
+        return SUBMIT
+
+    def _submit(self):
+        """Enter the answer and submit it"""
+        with self._span('submit'):
+            self.baseline = self.checker.captcha_state()
+            self.checker.enter_captcha_answer(self.answer)
+        return VERIFY
+
+    def _verify(self):
+        """Wait for the site's verdict and pick the next state"""
+        with self._span('captcha_verify'):
+            verdict, state = self.checker.wait_for_captcha_verdict(self.baseline)
+
+        if verdict == ACCEPTED:
+            self.checker.captcha_solver.report(self.source, True, self.image, self.answer)
+            print("CAPTCHA solved successfully!")
+            return ACCEPTED
+
+        if verdict is None:
+            # No signal either way - do not guess at the solver's accuracy
+            return self._failed_attempt("No CAPTCHA verdict in time, refreshing image...", REFRESH)
+
+        self.checker.captcha_solver.report(self.source, False, self.image, self.answer)
+        self.attempts += 1
+        if self.attempts >= self.max_attempts:
+            return FAILED
+
+        if state['src'] and state['src'] != self.baseline['src'] and state['ready']:
+            # The site already loaded the next image: solve it while the
+            # rejected answer is cleared away
+            print("CAPTCHA was incorrect, solving the new image...")
+            with self._span('captcha_capture'):
+                image_base64 = self.checker.capture_captcha_image()
+            if image_base64:
+                self._start_solving(image_base64)
+                self.checker.clear_captcha_input()
+                return SOLVE
+
+        # The attempt is already counted; fetch the next image ourselves
+        # rather than waiting for the site to swap it
+        print("CAPTCHA was incorrect, requesting a new image...")
+        self.checker.clear_captcha_input()
+        return REFRESH
+
+    def _refresh(self):
+        """Load a new CAPTCHA image in place, or reopen the modal if that is not possible"""
+        state = self.checker.captcha_state()
+        self.previous_src = state['src']
+        if self.checker.refresh_captcha_image():
+            return LOAD
+        print("CAPTCHA image cannot be refreshed in place, reloading the page...")
+        self.previous_src = None
+        self.checker.reload_captcha_modal(self.pnr_number)
+        return LOAD
@@ -0,0 +1,473 @@
+"""
+CAPTCHA Solvers for PNR Status Checker
+Pluggable solvers for the math CAPTCHA on the PNR enquiry page: a local
+template-matching engine that runs offline on CPU, and OpenAI Vision as
+a fallback when the local engine is not confident
+"""
+
+import base64
+import os
+import sys
+import threading
+import time
+import uuid
+from io import BytesIO
+from PIL import Image
+import openai
+from openai_client import shared_client
+
+
+# Template file names use words for characters that are awkward in paths
+GLYPH_NAMES = {
+    'plus': '+',
+    'minus': '-',
+    'times': '*',
+    'equals': '=',
+    'question': '?',
+}
+GLYPH_FILE_NAMES = {symbol: name for name, symbol in GLYPH_NAMES.items()}
+
+
+def otsu_threshold(img):
+    """Pick the gray level that best separates ink from background"""
+    histogram = img.histogram()
+    total = sum(histogram)
+    sum_all = sum(level * count for level, count in enumerate(histogram))
+    sum_bg = weight_bg = 0
+    best_level, best_variance = 127, -1.0
+    for level, count in enumerate(histogram):
+        weight_bg += count
+        if not weight_bg:
+            continue
+        weight_fg = total - weight_bg
+        if not weight_fg:
+            break
+        sum_bg += level * count
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+
+def preprocess_captcha(image_base64, max_size=(240, 80), binarize=True):
+    """
+    Shrink a CAPTCHA before it is solved
+    Flattens transparency onto white, downscales to fit max_size and, if
+    binarize is set, reduces it to a 1-bit PNG. Returns base64 PNG; the
+    input is returned unchanged if it cannot be decoded.
+    """
+    try:
+        img = Image.open(BytesIO(base64.b64decode(image_base64)))
+        img.load()
+    except Exception as e:
+        print(f"Could not preprocess CAPTCHA: {e}")
+        return image_base64
+
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGBA')
+        background = Image.new('RGBA', img.size, (255, 255, 255, 255))
+        img = Image.alpha_composite(background, img)
+    img = img.convert('L')
+    if img.width > max_size[0] or img.height > max_size[1]:
+        img.thumbnail(max_size, Image.LANCZOS)
+    if binarize:
+        threshold = otsu_threshold(img)
+        img = img.point(lambda p: 255 if p > threshold else 0).convert('1')
+
+    buffer = BytesIO()
+    img.save(buffer, 'PNG', optimize=True)
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+
+class SolverStats:
+    """Per-solver attempts, latency and verified accuracy, shared by all threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _entry(self, name):
+        return self._stats.setdefault(name, {
+            'attempts': 0, 'answered': 0, 'seconds': 0.0, 'correct': 0, 'rejected': 0,
+        })
+
+    def record_attempt(self, name, seconds, answered):
+        """Record one solve() call and whether it produced an answer"""
+        with self._lock:
+            entry = self._entry(name)
+            entry['attempts'] += 1
+            entry['seconds'] += seconds
+            if answered:
+                entry['answered'] += 1
+
+    def record_verdict(self, name, correct):
+        """Record whether the site accepted an answer from this solver"""
+        with self._lock:
+            self._entry(name)['correct' if correct else 'rejected'] += 1
+
+    def accuracy(self, name):
+        """Share of submitted answers the site accepted, or None without verdicts"""
+        with self._lock:
+            entry = self._stats.get(name)
+            verdicts = entry['correct'] + entry['rejected'] if entry else 0
+            return entry['correct'] / verdicts if verdicts else None
+
+    def verdicts(self, name):
+        with self._lock:
+            entry = self._stats.get(name)
+            return entry['correct'] + entry['rejected'] if entry else 0
+
+    def mean_seconds(self, name):
+        with self._lock:
+            entry = self._stats.get(name)
+            return entry['seconds'] / entry['attempts'] if entry and entry['attempts'] else None
+
+    def summary(self):
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._stats.items()}
+
+    def print_summary(self):
+        """Print a per-solver accuracy table"""
+        stats = self.summary()
+        if not stats:
+            return
+        print(f"\n{'Solver':<12}{'Attempts':>10}{'Answered':>10}{'Correct':>9}{'Rejected':>10}{'Accuracy':>10}{'Mean':>9}")
+        print("-" * 70)
+        for name, s in sorted(stats.items()):
+            verdicts = s['correct'] + s['rejected']
+            accuracy = f"{s['correct'] / verdicts:.0%}" if verdicts else '-'
+            mean = s['seconds'] / s['attempts'] if s['attempts'] else 0.0
+            print(f"{name:<12}{s['attempts']:>10}{s['answered']:>10}{s['correct']:>9}{s['rejected']:>10}"
+                  f"{accuracy:>10}{mean:>8.2f}s")
+
+
+class CaptchaSolver:
+    """Base class - solve() returns (answer, confidence) for a base64 PNG"""
+    name = 'base'
+
+    def __init__(self):
+        self.stats = SolverStats()
+
+    def solve(self, image_base64):
+        """Return the numeric answer as a string (or None) and a 0-1 confidence"""
+        raise NotImplementedError
+
+    def solve_tracked(self, image_base64):
+        """
+        solve() that also records the attempt in self.stats
+        Returns (answer, confidence, source) - pass source to report() once
+        the site has accepted or rejected the answer
+        """
+        start = time.perf_counter()
+        answer, confidence = self.solve(image_base64)
+        self.stats.record_attempt(self.name, time.perf_counter() - start, bool(answer))
+        return answer, confidence, self.name
+
+    def report(self, source, correct, image_base64=None, answer=None):
+        """
+        Record the site's verdict on an answer returned by solve_tracked()
+        image_base64 and answer let caching solvers remember verified answers
+        """
+        self.stats.record_verdict(source, correct)
+
+
+class OpenAICaptchaSolver(CaptchaSolver):
+    name = 'openai'
+
+    def __init__(self, api_key=None, model=None, client=None):
+        """
+        Initialize the solver with an OpenAI API key
+
+        client is an AsyncOpenAIClient to share; by default all OpenAI
+        solvers share one process-wide client. model overrides the
+        client's model (gpt-4o unless configured otherwise).
+        """
+        super().__init__()
+        if api_key:
+            openai.api_key = api_key
+        self.api_key = api_key
+        self.model = model
+        self.client = client
+
+    def solve(self, image_base64):
+        """
+        Solve math CAPTCHA using OpenAI Vision API
+        Returns the calculated answer
+        """
+        try:
+            client = self.client or shared_client(self.api_key or openai.api_key)
+            answer = client.complete(image_base64, self.model)
+            # Extract only numeric value
+            answer = ''.join(filter(str.isdigit, answer))
+            print(f"CAPTCHA solved: {answer}")
+            return (answer or None), (0.9 if answer else 0.0)
+
+        except Exception as e:
+            print(f"Error solving CAPTCHA: {str(e) or type(e).__name__}")
+            return None, 0.0
+
+
+class TemplateCaptchaSolver(CaptchaSolver):
+    """
+    Offline solver: binarize the image, split it into glyphs on blank
+    columns, match each glyph against labelled templates and evaluate
+    the resulting expression
+    """
+    name = 'local'
+    GLYPH_SIZE = (12, 16)
+
+    def __init__(self, templates_dir='captcha_templates'):
+        """Initialize the solver and load templates from templates_dir"""
+        super().__init__()
+        self.templates_dir = templates_dir
+        self.templates = []
+        self.load_templates()
+
+    def load_templates(self):
+        """Load <label>_<id>.png glyph templates as bitmasks"""
+        self.templates = []
+        if not os.path.isdir(self.templates_dir):
+            return
+        for file_name in sorted(os.listdir(self.templates_dir)):
+            stem, ext = os.path.splitext(file_name)
+            if ext.lower() != '.png' or '_' not in stem:
+                continue
+            label = stem.split('_', 1)[0]
+            label = GLYPH_NAMES.get(label, label)
+            with Image.open(os.path.join(self.templates_dir, file_name)) as img:
+                self.templates.append((label, self._to_mask(img.convert('1'))))
+
+    @staticmethod
+    def _decode(image_base64):
+        """Decode a base64 image into a grayscale PIL image"""
+        return Image.open(BytesIO(base64.b64decode(image_base64))).convert('L')
+
+    def binarize(self, img):
+        """Return a 1-bit image where ink pixels are white (1)"""
+        threshold = otsu_threshold(img)
+        ink = img.point(lambda p: 255 if p <= threshold else 0)
+        # Ink is the minority colour; flip for light text on a dark background
+        if sum(ink.histogram()[128:]) > (img.width * img.height) // 2:
+            ink = ink.point(lambda p: 255 - p)
+        return ink.convert('1')
+
+    def segment(self, image_base64):
+        """Split the CAPTCHA into normalized glyph bitmasks, left to right"""
+        ink = self.binarize(self._decode(image_base64))
+        width, height = ink.size
+        pixels = ink.load()
+        column_has_ink = [any(pixels[x, y] for y in range(height)) for x in range(width)]
+        # Crop every glyph to the text line, not its own box, so '-' keeps
+        # its shape instead of being stretched into a block
+        line_box = ink.getbbox()
+        if not line_box:
+            return []
+        top, bottom = line_box[1], line_box[3]
+
+        glyphs = []
+        x = 0
+        while x < width:
+            if not column_has_ink[x]:
+                x += 1
+                continue
+            start = x
+            while x < width and column_has_ink[x]:
+                x += 1
+            # Skip specks narrower than two columns
+            if x - start < 2:
+                continue
+            glyphs.append(self._to_mask(ink.crop((start, top, x, bottom))))
+        return glyphs
+
+    def _to_mask(self, glyph):
+        """Resize a 1-bit glyph to GLYPH_SIZE and pack it into an int"""
+        glyph = glyph.convert('L').resize(self.GLYPH_SIZE).point(lambda p: 255 if p >= 128 else 0)
+        mask = 0
+        for bit, value in enumerate(glyph.getdata()):
+            if value:
+                mask |= 1 << bit
+        return mask
+
+    def match(self, mask):
+        """Return the best (label, similarity) for a glyph bitmask"""
+        total = self.GLYPH_SIZE[0] * self.GLYPH_SIZE[1]
+        best_label, best_score = None, 0.0
+        for label, template in self.templates:
+            score = 1.0 - bin(mask ^ template).count('1') / total
+            if score > best_score:
+                best_label, best_score = label, score
+        return best_label, best_score
+
+    @staticmethod
+    def evaluate(expression):
+        """Evaluate an expression like '12+7=?' with + - * only"""
+        expression = expression.split('=', 1)[0].replace('?', '')
+        numbers, operators, current = [], [], ''
+        for char in expression:
+            if char.isdigit():
+                current += char
+            elif char in '+-*':
+                if not current:
+                    return None
+                numbers.append(int(current))
+                operators.append(char)
+                current = ''
+            else:
+                return None
+        if not current or not operators:
+            return None
+        numbers.append(int(current))
+
+        # Multiplication binds tighter than addition and subtraction
+        terms, signs = [numbers[0]], []
+        for operator, number in zip(operators, numbers[1:]):
+            if operator == '*':
+                terms[-1] *= number
+            else:
+                terms.append(number)
+                signs.append(operator)
+        result = terms[0]
+        for sign, term in zip(signs, terms[1:]):
+            result = result + term if sign == '+' else result - term
+        return str(result)
+
+    def solve(self, image_base64):
+        """Read the expression glyph by glyph; confidence is the weakest match"""
+        if not self.templates:
+            return None, 0.0
+        try:
+            glyphs = self.segment(image_base64)
+        except Exception as e:
+            print(f"Error segmenting CAPTCHA: {e}")
+            return None, 0.0
+        if not glyphs:
+            return None, 0.0
+
+        expression, confidence = '', 1.0
+        for mask in glyphs:
+            label, score = self.match(mask)
+            if label is None:
+                return None, 0.0
+            expression += label
+            confidence = min(confidence, score)
+
+        answer = self.evaluate(expression)
+        if answer is None or answer.startswith('-'):
+            return None, 0.0
+        print(f"CAPTCHA read locally: {expression} -> {answer} (confidence {confidence:.2f})")
+        return answer, confidence
+
+    def learn(self, image_base64, text):
+        """
+        Save the glyphs of a CAPTCHA as templates
+
+        text is the expression exactly as drawn, e.g. '12+7=?'.
+        Returns the number of templates written.
+        """
+        text = text.replace(' ', '')
+        glyphs = self.segment(image_base64)
+        if len(glyphs) != len(text):
+            raise ValueError(f"Found {len(glyphs)} glyphs but text has {len(text)} characters")
+
+        os.makedirs(self.templates_dir, exist_ok=True)
+        width, height = self.GLYPH_SIZE
+        for char, mask in zip(text, glyphs):
+            img = Image.new('L', self.GLYPH_SIZE)
+            img.putdata([255 if mask >> bit & 1 else 0 for bit in range(width * height)])
+            label = GLYPH_FILE_NAMES.get(char, char)
+            img.save(os.path.join(self.templates_dir, f"{label}_{uuid.uuid4().hex[:8]}.png"))
+        self.load_templates()
+        return len(glyphs)
+
+
+class FallbackCaptchaSolver(CaptchaSolver):
+    """
+    Try solvers in turn and accept the first confident answer
+
+    Solvers start in the given order. Once a solver has min_verdicts
+    accepted/rejected answers, it moves to the front if its accuracy is
+    at least min_accuracy (fastest reliable solver first) or to the back
+    if it is below.
+    """
+    name = 'fallback'
+
+    def __init__(self, solvers, min_confidence=0.85, min_accuracy=0.8, min_verdicts=5):
+        super().__init__()
+        self.solvers = list(solvers)
+        self.min_confidence = min_confidence
+        self.min_accuracy = min_accuracy
+        self.min_verdicts = min_verdicts
+
+    def ranked_solvers(self):
+        """Solvers in the order they should be tried"""
+        reliable, unproven, unreliable = [], [], []
+        for solver in self.solvers:
+            if self.stats.verdicts(solver.name) < self.min_verdicts:
+                unproven.append(solver)
+            elif self.stats.accuracy(solver.name) >= self.min_accuracy:
+                reliable.append(solver)
+            else:
+                unreliable.append(solver)
+        reliable.sort(key=lambda solver: self.stats.mean_seconds(solver.name) or 0.0)
+        return reliable + unproven + unreliable
+
+    def solve(self, image_base64):
+        answer, confidence, _ = self.solve_tracked(image_base64)
+        return answer, confidence
+
+    def solve_tracked(self, image_base64):
+        best = (None, 0.0, None)
+        for solver in self.ranked_solvers():
+            start = time.perf_counter()
+            answer, confidence = solver.solve(image_base64)
+            self.stats.record_attempt(solver.name, time.perf_counter() - start, bool(answer))
+            if answer and confidence >= self.min_confidence:
+                return answer, confidence, solver.name
+            if answer and confidence > best[1]:
+                best = (answer, confidence, solver.name)
+        return best
+
+
+def build_captcha_solver(api_key, mode='auto', templates_dir='captcha_templates', min_confidence=0.85,
+                         answer_cache=None, openai_client=None):
+    """
+    Build the solver selected by mode
+
+    'local'  - offline template matching only
+    'openai' - OpenAI Vision only
+    'auto'   - local first, OpenAI when local confidence is below min_confidence
+
+    With a CaptchaAnswerCache, repeated images are answered from the cache.
+    openai_client is the AsyncOpenAIClient the OpenAI solver sends requests through.
+    """
+    if mode == 'local':
+        solver = TemplateCaptchaSolver(templates_dir)
+    elif mode == 'openai':
+        solver = OpenAICaptchaSolver(api_key, client=openai_client)
+    elif mode == 'auto':
+        solver = FallbackCaptchaSolver(
+            [TemplateCaptchaSolver(templates_dir), OpenAICaptchaSolver(api_key, client=openai_client)],
+            min_confidence=min_confidence
+        )
+    else:
+        raise ValueError(f"Unknown CAPTCHA solver: {mode}")
+    if answer_cache is not None:
+        from captcha_cache import CachedCaptchaSolver
+        solver = CachedCaptchaSolver(solver, answer_cache)
+    return solver
+
+
+# Build templates from saved CAPTCHA images:
+#   python captcha_solver.py learn captcha.png "12+7=?" [templates_dir]
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] != 'learn':
+        print('Usage: python captcha_solver.py learn <image.png> "<expression>" [templates_dir]')
+        sys.exit(1)
+
+    with open(sys.argv[2], 'rb') as f:
+        image_base64 = base64.b64encode(f.read()).decode('utf-8')
+    templates_dir = sys.argv[4] if len(sys.argv) > 4 else 'captcha_templates'
+    count = TemplateCaptchaSolver(templates_dir).learn(image_base64, sys.argv[3])
+    print(f"Saved {count} glyph templates to {templates_dir}")
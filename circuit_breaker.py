@@ -0,0 +1,172 @@
+"""
+Circuit Breaker
+Shared across workers so that once the enquiry site stops answering, the
+remaining PNRs fail at once instead of each one spending its own retries
+on it. After a cool-down a single probe request is let through; its result
+closes the circuit again or reopens it for longer.
+"""
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpen(Exception):
+    """Raised instead of contacting a site whose circuit is open"""
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """
+    Exponential backoff with jitter for retry number attempt (0-based)
+    Returns a random delay between half and all of min(cap, base * 2**attempt)
+    so workers that failed together do not retry together
+    """
+    delay = min(cap, base * (2 ** attempt))
+    return random.uniform(delay / 2, delay)
+
+
+class CircuitBreaker:
+    def __init__(self, name='site', failure_threshold=5, reset_timeout=30.0, max_reset_timeout=600.0):
+        """
+        Start closed (requests allowed)
+
+        failure_threshold - consecutive failures that open the circuit
+        reset_timeout     - seconds the circuit stays open before one probe
+                            request is allowed (half-open)
+        max_reset_timeout - each failed probe doubles the open period up to this
+        """
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.stats = {'opened': 0, 'rejected': 0, 'probes': 0}
+        self._open_for = reset_timeout
+        self._open_until = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def retry_in(self):
+        """Seconds until the next probe is allowed (0 unless open)"""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self._open_until - time.monotonic())
+
+    def allow(self):
+        """
+        Whether a request may go out now
+        In the half-open state only the first caller gets True (the probe);
+        it must report back through record_success/record_failure
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() >= self._open_until:
+                self.state = HALF_OPEN
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self.stats['probes'] += 1
+                print(f"Circuit '{self.name}' half-open, sending a probe request")
+                return True
+            self.stats['rejected'] += 1
+            return False
+
+    def is_open(self):
+        """True while the circuit is open and still cooling down"""
+        with self._lock:
+            return self.state == OPEN and time.monotonic() < self._open_until
+
+    def blocked(self):
+        """
+        True while a request would be rejected: open and cooling down, or
+        half-open with the probe already out
+        """
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() < self._open_until
+            return self.state == HALF_OPEN and self._probe_in_flight
+
+    def check(self, probe=True):
+        """
+        Raise CircuitOpen unless a request may go out now (see allow)
+        probe=False only fails while is_open(), without claiming the
+        half-open probe - for a cheap test before the actual request
+        """
+        if probe:
+            allowed = self.allow()
+        else:
+            allowed = not self.is_open()
+            if not allowed:
+                with self._lock:
+                    self.stats['rejected'] += 1
+        if not allowed:
+            raise CircuitOpen(
+                f"Circuit '{self.name}' is open after {self.failures} consecutive failures, "
+                f"not contacting the site (next probe in {self.retry_in():.0f}s)"
+            )
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                print(f"✓ Circuit '{self.name}' closed again")
+            self.state = CLOSED
+            self.failures = 0
+            self._open_for = self.reset_timeout
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                # The probe failed: stay away longer this time
+                self._open_for = min(self.max_reset_timeout, self._open_for * 2)
+                self._open()
+            elif self.state == CLOSED and self.failures >= self.failure_threshold:
+                self._open()
+
+    def _release_probe(self):
+        """Let another caller send the half-open probe (this one never finished)"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def trip(self):
+        """Open the circuit now, e.g. when the failure is known not to be transient"""
+        with self._lock:
+            if self.state != OPEN:
+                self._open()
+
+    def _open(self):
+        """Open the circuit for a jittered _open_for seconds (lock held)"""
+        self.state = OPEN
+        self._probe_in_flight = False
+        self._open_until = time.monotonic() + random.uniform(0.8, 1.0) * self._open_for
+        self.stats['opened'] += 1
+        print(f"✗ Circuit '{self.name}' open after {self.failures} failure(s), "
+              f"probing again in {self._open_until - time.monotonic():.0f}s")
+
+    @contextmanager
+    def guard(self):
+        """
+        Run one request through the breaker: raises CircuitOpen if it may
+        not go out, and counts an exception in the block as a failure.
+        KeyboardInterrupt/SystemExit pass through without counting, but
+        give back the half-open probe so another request can take it.
+        """
+        self.check()
+        try:
+            yield
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            self._release_probe()
+            raise
+        self.record_success()
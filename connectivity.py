@@ -0,0 +1,128 @@
+"""
+Connectivity Health Check
+Diagnoses whether the enquiry host is reachable with a DNS lookup and a TCP
+connect - no page load, no third-party site. Results are cached per host so
+a run pays for the check once, plus once per failure window. The check is
+direct, so behind a proxy (which Chrome and requests go through) a failed
+result only hints at an outage and is never treated as fatal.
+"""
+
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+from urllib.request import getproxies, proxy_bypass
+
+
+# Reasons that will not go away by retrying the same request seconds later
+FATAL_REASONS = ('dns', 'refused')
+
+
+def proxy_for(url):
+    """The proxy requests to url go through (environment or system settings), or None"""
+    parsed = urlparse(url)
+    proxies = getproxies()
+    proxy = proxies.get(parsed.scheme) or proxies.get('all')
+    if not proxy or (parsed.hostname and proxy_bypass(parsed.hostname)):
+        return None
+    return proxy
+
+
+def is_fatal(result):
+    """True if a diagnose() result rules out reaching the host at all"""
+    return result['reason'] in FATAL_REASONS and not result.get('proxy')
+
+
+def diagnose(url, timeout=5.0):
+    """
+    Check DNS and TCP reachability of the host of url
+    Returns a dict with 'host', 'ok', 'reason' ('ok', 'dns', 'refused',
+    'timeout' or 'unreachable'), 'detail', 'proxy' (see proxy_for),
+    'seconds' and 'checked_at'
+    """
+    parsed = urlparse(url)
+    host = parsed.hostname or url
+    port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+    start = time.perf_counter()
+    reason, detail = 'ok', ''
+    try:
+        addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        reason, detail = 'dns', str(e)
+    else:
+        reason, detail = 'unreachable', 'no address'
+        for family, kind, proto, _, address in addresses:
+            try:
+                with socket.socket(family, kind, proto) as sock:
+                    sock.settimeout(timeout)
+                    sock.connect(address)
+                reason, detail = 'ok', f"{address[0]}:{address[1]}"
+                break
+            except ConnectionRefusedError as e:
+                reason, detail = 'refused', str(e)
+            except socket.timeout:
+                reason, detail = 'timeout', f"no answer within {timeout:.0f}s"
+            except OSError as e:
+                reason, detail = 'unreachable', str(e)
+    return {
+        'host': host,
+        'ok': reason == 'ok',
+        'reason': reason,
+        'detail': detail,
+        'proxy': proxy_for(url),
+        'seconds': time.perf_counter() - start,
+        'checked_at': time.time(),
+    }
+
+
+class ConnectivityCheck:
+    def __init__(self, max_age=60.0, timeout=5.0):
+        """
+        Cache diagnose() results per host
+
+        max_age - seconds a result is reused before the host is checked again
+        timeout - TCP connect timeout of each check
+        """
+        self.max_age = max_age
+        self.timeout = timeout
+        self._results = {}
+        self._lock = threading.Lock()
+        self._host_locks = {}
+
+    def _host_lock(self, host):
+        with self._lock:
+            return self._host_locks.setdefault(host, threading.Lock())
+
+    def status(self, url):
+        """The cached result for the host of url if it is still fresh, else None"""
+        host = urlparse(url).hostname or url
+        with self._lock:
+            result = self._results.get(host)
+        if result and time.time() - result['checked_at'] < self.max_age:
+            return result
+        return None
+
+    def check(self, url, newer_than=None):
+        """
+        Return a fresh-enough result for the host of url, diagnosing it if needed
+
+        newer_than (a time.time() value, e.g. when a page load failed) only
+        accepts results checked after it. Concurrent callers for the same
+        host share a single diagnosis.
+        """
+        host = urlparse(url).hostname or url
+        with self._host_lock(host):
+            result = self.status(url)
+            if result and (newer_than is None or result['checked_at'] >= newer_than):
+                return result
+            result = diagnose(url, self.timeout)
+            with self._lock:
+                self._results[host] = result
+        if result['ok']:
+            print(f"✓ {host} reachable ({result['seconds'] * 1000:.0f} ms)")
+        elif result['proxy']:
+            print(f"ℹ️ {host} not reachable directly ({result['reason']}), "
+                  f"requests go through proxy {result['proxy']}")
+        else:
+            print(f"✗ {host} not reachable: {result['reason']} ({result['detail']})")
+        return result
@@ -0,0 +1,113 @@
+"""
+WebDriver Pool for PNR Status Checker
+Keeps warm Chrome instances alive across PNR checks so each check
+does not pay for a full browser start
+"""
+
+import queue
+import threading
+
+
+class DriverPool:
+    def __init__(self, factory, size=1, max_uses=25):
+        """
+        Initialize the pool
+
+        factory  - callable that returns a new WebDriver instance
+        size     - maximum number of live drivers
+        max_uses - recycle a driver after this many checks (0 = never)
+        """
+        self.factory = factory
+        self.size = max(1, int(size))
+        self.max_uses = max(0, int(max_uses))
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._uses = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self, timeout=None):
+        """Get a driver from the pool, starting a new one if none are idle"""
+        if self._closed:
+            raise RuntimeError("Driver pool is closed")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("Timed out waiting for a free browser")
+
+        try:
+            driver = self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                print("Starting new browser for pool...")
+                driver = self.factory()
+            except Exception:
+                self._slots.release()
+                raise
+            with self._lock:
+                self._uses[id(driver)] = 0
+
+        with self._lock:
+            self._uses[id(driver)] = self._uses.get(id(driver), 0) + 1
+        return driver
+
+    def release(self, driver, discard=False):
+        """
+        Return a driver to the pool
+
+        The driver is reset before reuse. It is shut down instead if it
+        crashed, failed to reset, hit max_uses or the pool is closed.
+        """
+        try:
+            with self._lock:
+                uses = self._uses.get(id(driver), 0)
+            worn_out = self.max_uses and uses >= self.max_uses
+
+            if discard or worn_out or self._closed or not self.reset_driver(driver):
+                if worn_out:
+                    print(f"Recycling browser after {uses} uses")
+                self._discard(driver)
+            else:
+                self._idle.put(driver)
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def reset_driver(driver):
+        """Clear cookies, storage and any open modal so the next PNR starts clean"""
+        try:
+            driver.delete_all_cookies()
+            driver.execute_script(
+                "try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}"
+            )
+            driver.get("about:blank")
+            return True
+        except Exception as e:
+            print(f"Browser reset failed, discarding it: {e}")
+            return False
+
+    @staticmethod
+    def is_alive(driver):
+        """Cheap liveness probe - a crashed browser fails any command"""
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, driver):
+        """Shut down a driver and forget its use count"""
+        with self._lock:
+            self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        """Shut down every idle driver; drivers still in use are closed on release"""
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
@@ -0,0 +1,75 @@
+"""
+Chromedriver Resolver
+Finds the chromedriver binary once per process instead of asking
+webdriver-manager on every browser start. The resolved path is also
+persisted so later runs skip version resolution (and the network)
+entirely; CHROMEDRIVER_PATH pins a pre-provisioned binary for fully
+offline use.
+"""
+
+import json
+import os
+import threading
+import time
+from webdriver_manager.chrome import ChromeDriverManager
+
+
+CACHE_FILE = '.chromedriver_cache.json'
+
+_resolved_path = None
+_lock = threading.Lock()
+
+
+def is_usable(path):
+    """Cheap check that path is an existing executable file"""
+    return bool(path) and os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+def _read_cache(cache_file):
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f).get('path')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _write_cache(cache_file, path):
+    try:
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({'path': path, 'resolved_at': time.time()}, f)
+    except OSError as e:
+        print(f"Could not save chromedriver path to {cache_file}: {e}")
+
+
+def resolve_chromedriver(cache_file=CACHE_FILE, refresh=False):
+    """
+    Return the chromedriver path, resolving it at most once per process
+
+    Order: CHROMEDRIVER_PATH env var, the path cached in this process, the
+    path persisted in cache_file, and finally webdriver-manager (which may
+    download a driver). refresh=True skips both caches, e.g. after Chrome
+    was updated and the cached driver no longer matches it.
+    """
+    global _resolved_path
+    with _lock:
+        env_path = os.getenv('CHROMEDRIVER_PATH')
+        if env_path:
+            if not is_usable(env_path):
+                raise FileNotFoundError(f"CHROMEDRIVER_PATH is not an executable file: {env_path}")
+            _resolved_path = env_path
+            return env_path
+
+        if not refresh:
+            if _resolved_path:
+                return _resolved_path
+            path = _read_cache(cache_file)
+            if is_usable(path):
+                _resolved_path = path
+                return path
+
+        print("Resolving chromedriver...")
+        path = ChromeDriverManager().install()
+        _write_cache(cache_file, path)
+        _resolved_path = path
+        print(f"✓ Using chromedriver at {path}")
+        return path
@@ -0,0 +1,393 @@
+"""
+Email Templates for PNR Status
+Precompiled HTML and plain-text templates for status, error and digest
+emails. Static markup and CSS are built once at import; scraped values are
+HTML-escaped before they are substituted.
+"""
+
+from html import escape
+from string import Template
+from pnr_parser import status_category
+
+
+# Readable names for the transition types reported by status_history
+CHANGE_LABELS = {
+    'confirmed': '✅ Confirmed',
+    'rac': '🔄 Moved to RAC',
+    'waitlist_moved': '⬆️ Moved up',
+    'waitlist_worse': '⬇️ Moved down',
+    'cancelled': '❌ Cancelled',
+    'status_changed': 'Updated',
+}
+
+STATUS_CLASSES = {
+    'CNF': 'status-confirmed',
+    'RAC': 'status-rac',
+}
+
+STYLE = """
+        body {
+            font-family: Arial, sans-serif;
+            background-color: #f4f4f4;
+            padding: 20px;
+        }
+        .container {
+            background-color: white;
+            border-radius: 10px;
+            padding: 30px;
+            max-width: 800px;
+            margin: 0 auto;
+            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+        }
+        .header {
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            padding: 20px;
+            border-radius: 8px;
+            text-align: center;
+            margin-bottom: 30px;
+        }
+        .pnr-number {
+            font-size: 24px;
+            font-weight: bold;
+            color: #ffd700;
+        }
+        .section {
+            margin-bottom: 30px;
+        }
+        .section-title {
+            font-size: 20px;
+            font-weight: bold;
+            color: #667eea;
+            margin-bottom: 15px;
+            border-bottom: 2px solid #667eea;
+            padding-bottom: 5px;
+        }
+        table {
+            width: 100%;
+            border-collapse: collapse;
+            margin-top: 10px;
+        }
+        th {
+            background-color: #667eea;
+            color: white;
+            padding: 12px;
+            text-align: left;
+            font-weight: bold;
+        }
+        td {
+            padding: 12px;
+            border-bottom: 1px solid #ddd;
+        }
+        tr:nth-child(even) {
+            background-color: #f9f9f9;
+        }
+        .info-row {
+            display: flex;
+            justify-content: space-between;
+            padding: 10px 0;
+            border-bottom: 1px solid #eee;
+        }
+        .info-label {
+            font-weight: bold;
+            color: #555;
+        }
+        .info-value {
+            color: #333;
+        }
+        .status-badge {
+            display: inline-block;
+            padding: 5px 15px;
+            border-radius: 20px;
+            font-weight: bold;
+            font-size: 14px;
+        }
+        .status-confirmed {
+            background-color: #4CAF50;
+            color: white;
+        }
+        .status-waiting {
+            background-color: #FF9800;
+            color: white;
+        }
+        .status-rac {
+            background-color: #2196F3;
+            color: white;
+        }
+        .change-old {
+            color: #888;
+            text-decoration: line-through;
+        }
+        .change-new {
+            font-weight: bold;
+            color: #333;
+        }
+        .footer {
+            text-align: center;
+            color: #888;
+            margin-top: 30px;
+            font-size: 12px;
+            padding-top: 20px;
+            border-top: 1px solid #ddd;
+        }
+        .timestamp {
+            color: #888;
+            font-size: 14px;
+            text-align: right;
+            margin-top: 20px;
+        }
+        .error-box {
+            background-color: #ffebee;
+            border: 1px solid #ef5350;
+            padding: 15px;
+            border-radius: 5px;
+            margin-top: 15px;
+            font-family: monospace;
+        }
+"""
+
+# Everything up to the first section never changes, so it is built once
+PAGE_START = (
+    '<html>\n<head>\n    <meta charset="utf-8">\n    <style>' + STYLE + '    </style>\n</head>\n'
+    '<body>\n    <div class="container">\n'
+)
+
+PAGE_END = Template("""
+        <div class="timestamp">
+            ⏰ Checked on: $timestamp
+        </div>
+
+        <div class="footer">
+            <p>This is an automated notification from PNR Status Checker</p>
+            <p>Powered by GitHub Actions & OpenAI</p>
+        </div>
+    </div>
+</body>
+</html>
+""")
+
+HEADER = Template("""
+        <div class="header">
+            <h1>$title</h1>
+            <div class="pnr-number">PNR: $pnr_number</div>
+        </div>
+""")
+
+CHANGES_SECTION = Template("""
+        <div class="section">
+            <div class="section-title">🔔 Status Changes</div>
+            <table>
+                <tr>
+                    <th>Passenger</th>
+                    <th>Previous Status</th>
+                    <th>Current Status</th>
+                    <th>Change</th>
+                </tr>
+$rows
+            </table>
+        </div>
+""")
+
+CHANGE_ROW = Template("""\
+                <tr>
+                    <td>$passenger_no</td>
+                    <td><span class="change-old">$old</span></td>
+                    <td><span class="change-new">$new</span></td>
+                    <td>$label</td>
+                </tr>""")
+
+JOURNEY_SECTION = Template("""
+        <div class="section">
+            <div class="section-title">📅 Journey Details</div>
+            <table>
+                <tr>
+                    <th>Train Number</th>
+                    <th>Train Name</th>
+                    <th>Boarding Date</th>
+                    <th>Class</th>
+                </tr>
+                <tr>
+                    <td>$train_number</td>
+                    <td>$train_name</td>
+                    <td>$boarding_date</td>
+                    <td>$class_</td>
+                </tr>
+            </table>
+
+            <div style="margin-top: 20px;">
+                <div class="info-row">
+                    <span class="info-label">From:</span>
+                    <span class="info-value">$from_</span>
+                </div>
+                <div class="info-row">
+                    <span class="info-label">To:</span>
+                    <span class="info-value">$to</span>
+                </div>
+                <div class="info-row">
+                    <span class="info-label">Reserved Upto:</span>
+                    <span class="info-value">$reserved_upto</span>
+                </div>
+                <div class="info-row">
+                    <span class="info-label">Boarding Point:</span>
+                    <span class="info-value">$boarding_point</span>
+                </div>
+            </div>
+        </div>
+""")
+
+PASSENGER_SECTION = Template("""
+        <div class="section">
+            <div class="section-title">👥 Passenger Details</div>
+            <table>
+                <tr>
+                    <th>Passenger</th>
+                    <th>Booking Status</th>
+                    <th>Current Status</th>
+                </tr>
+$rows
+            </table>
+        </div>
+""")
+
+PASSENGER_ROW = Template("""\
+                <tr>
+                    <td>$passenger_no</td>
+                    <td>$booking_status</td>
+                    <td><span class="status-badge $status_class">$current_status</span></td>
+                </tr>""")
+
+ERROR_SECTION = Template("""
+        <div class="section">
+            <div class="error-box">
+                <strong>Error:</strong><br>
+                $error_message
+            </div>
+            <p style="margin-top: 20px; color: #666;">
+                The system will automatically retry on the next scheduled run.
+            </p>
+        </div>
+""")
+
+DIGEST_SEPARATOR = '\n        <div style="margin-bottom: 40px;"></div>\n'
+
+
+def _escaped(data, fields):
+    """HTML-escape the given fields of a dict, renaming keys that clash with Python keywords"""
+    values = {}
+    for field in fields:
+        key = field + '_' if field in ('class', 'from') else field
+        values[key] = escape(str(data.get(field, '') or ''))
+    return values
+
+
+def status_class(status):
+    """CSS badge class for a current_status value"""
+    return STATUS_CLASSES.get(status_category(status), 'status-waiting')
+
+
+def visible_changes(changes):
+    """Changes worth showing - everything except the first-check marker"""
+    return [change for change in (changes or []) if change['type'] != 'new']
+
+
+def render_pnr_section(pnr_number, journey_data, passenger_data, changes=None):
+    """HTML for one PNR: header, status changes, journey and passenger details"""
+    parts = [HEADER.substitute(title='🚂 Indian Railways PNR Status', pnr_number=escape(str(pnr_number)))]
+
+    changes = visible_changes(changes)
+    if changes:
+        rows = '\n'.join(
+            CHANGE_ROW.substitute(
+                _escaped(change, ('passenger_no', 'old', 'new')),
+                label=CHANGE_LABELS.get(change['type'], escape(change['type']))
+            )
+            for change in changes
+        )
+        parts.append(CHANGES_SECTION.substitute(rows=rows))
+
+    if journey_data:
+        parts.append(JOURNEY_SECTION.substitute(_escaped(journey_data, (
+            'train_number', 'train_name', 'boarding_date', 'class',
+            'from', 'to', 'reserved_upto', 'boarding_point',
+        ))))
+
+    if passenger_data:
+        rows = '\n'.join(
+            PASSENGER_ROW.substitute(
+                _escaped(passenger, ('passenger_no', 'booking_status', 'current_status')),
+                status_class=status_class(passenger.get('current_status'))
+            )
+            for passenger in passenger_data
+        )
+        parts.append(PASSENGER_SECTION.substitute(rows=rows))
+
+    return ''.join(parts)
+
+
+def render_error_section(pnr_number, error_message):
+    """HTML for a PNR whose check failed"""
+    return (
+        HEADER.substitute(title='⚠️ PNR Status Check Failed', pnr_number=escape(str(pnr_number)))
+        + ERROR_SECTION.substitute(error_message=escape(str(error_message)))
+    )
+
+
+def render_document(sections, timestamp):
+    """Wrap rendered sections in the page head, timestamp and footer"""
+    return PAGE_START + DIGEST_SEPARATOR.join(sections) + PAGE_END.substitute(timestamp=escape(timestamp))
+
+
+def render_pnr_text(pnr_number, journey_data, passenger_data, changes=None):
+    """Plain-text version of render_pnr_section"""
+    lines = [f"PNR: {pnr_number}", "=" * 40]
+
+    changes = visible_changes(changes)
+    if changes:
+        lines += ["", "STATUS CHANGES"]
+        lines += [
+            f"  {change['passenger_no']}: {change['old']} -> {change['new']} "
+            f"({CHANGE_LABELS.get(change['type'], change['type'])})"
+            for change in changes
+        ]
+
+    if journey_data:
+        lines += [
+            "",
+            "JOURNEY DETAILS",
+            f"  Train          : {journey_data.get('train_number', '')} {journey_data.get('train_name', '')}",
+            f"  Boarding Date  : {journey_data.get('boarding_date', '')}",
+            f"  Class          : {journey_data.get('class', '')}",
+            f"  From           : {journey_data.get('from', '')}",
+            f"  To             : {journey_data.get('to', '')}",
+            f"  Reserved Upto  : {journey_data.get('reserved_upto', '')}",
+            f"  Boarding Point : {journey_data.get('boarding_point', '')}",
+        ]
+
+    if passenger_data:
+        lines += ["", "PASSENGER DETAILS"]
+        lines += [
+            f"  {passenger.get('passenger_no', '')}: {passenger.get('booking_status', '')} -> "
+            f"{passenger.get('current_status', '')}"
+            for passenger in passenger_data
+        ]
+
+    return '\n'.join(lines)
+
+
+def render_error_text(pnr_number, error_message):
+    """Plain-text version of render_error_section"""
+    return '\n'.join([
+        f"PNR: {pnr_number}",
+        "=" * 40,
+        "PNR status check failed",
+        f"Error: {error_message}",
+        "The system will automatically retry on the next scheduled run.",
+    ])
+
+
+def render_text_document(sections, timestamp):
+    """Join plain-text sections and add the timestamp and footer"""
+    return '\n\n\n'.join(sections) + (
+        f"\n\nChecked on: {timestamp}\n"
+        "This is an automated notification from PNR Status Checker\n"
+    )
@@ -0,0 +1,163 @@
+"""
+Direct HTTP PNR Enquiry Client
+Talks to the enquiry endpoints over plain HTTP instead of driving Chrome:
+fetches the CAPTCHA image bytes, submits the PNR with the answer and parses
+the response into the same journey_details/passenger_details dicts
+"""
+
+import base64
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from pnr_parser import parse_result_json, parse_result_html
+from captcha_solver import preprocess_captcha
+from circuit_breaker import CircuitBreaker, CircuitOpen, backoff_delay
+
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+
+class CaptchaRejected(Exception):
+    """The enquiry endpoint rejected the CAPTCHA answer"""
+
+
+class PNRHttpClient:
+    BASE_URL = "https://www.indianrail.gov.in/enquiry/"
+    PAGE_PATH = "PNR/PnrEnquiry.html?locale=en"
+    CAPTCHA_PATH = "captchaDraw.png"
+    SUBMIT_PATH = "CommonCaptcha"
+
+    def __init__(self, captcha_solver, base_url=None, timeout=15, pool_size=10, rate_limiter=None,
+                 preprocess=True, circuit_breaker=None):
+        """
+        Initialize the client
+
+        The CAPTCHA is tied to the server-side session cookie, so every
+        thread gets its own requests.Session (own cookies). All sessions
+        share one keep-alive connection pool of pool_size connections.
+        preprocess downscales and binarizes CAPTCHAs before solving.
+        Connection errors and 5xx responses count against circuit_breaker.
+        """
+        self.captcha_solver = captcha_solver
+        self.preprocess = preprocess
+        self.base_url = base_url or self.BASE_URL
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker or CircuitBreaker('http')
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._local = threading.local()
+
+    def _session(self):
+        """requests.Session owned by the current thread, warmed up on first use"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('https://', self.adapter)
+            session.mount('http://', self.adapter)
+            session.headers.update({
+                'User-Agent': USER_AGENT,
+                'Accept-Language': 'en-US,en',
+                'Referer': self.base_url + self.PAGE_PATH,
+            })
+            self._local.session = session
+            # Loading the page once sets the session cookie the CAPTCHA needs
+            self._get(self.PAGE_PATH)
+        return session
+
+    def _get(self, path, rate_limited=False, **kwargs):
+        """
+        GET a path under base_url through the circuit breaker
+        rate_limited requests also wait for the rate limiter - only the
+        submit, so a PNR costs one slot as a page load does in the browser
+        """
+        url = self.base_url + path
+        session = self._session()
+        if rate_limited and self.rate_limiter:
+            self.rate_limiter.wait(url)
+        with self.circuit_breaker.guard():
+            response = session.get(url, timeout=self.timeout, **kwargs)
+            # Client errors mean the site is up; only server errors count
+            if response.status_code >= 500:
+                response.raise_for_status()
+        response.raise_for_status()
+        return response
+
+    def fetch_captcha(self):
+        """Download a fresh CAPTCHA image and return it base64 encoded"""
+        response = self._get(self.CAPTCHA_PATH, params={'_': int(time.time() * 1000)})
+        image_base64 = base64.b64encode(response.content).decode('utf-8')
+        return preprocess_captcha(image_base64) if self.preprocess else image_base64
+
+    def submit(self, pnr_number, answer):
+        """
+        Submit the PNR and CAPTCHA answer
+        Returns the parsed result, raising CaptchaRejected for a wrong answer
+        """
+        response = self._get(self.SUBMIT_PATH, rate_limited=True, params={
+            'inputCaptcha': answer,
+            'inputPnrNo': pnr_number,
+            'inputPage': 'PNR',
+            'language': 'en',
+        })
+
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+
+        if data is not None:
+            result = parse_result_json(data)
+            if result:
+                return result
+            message = str(data.get('errorMessage', '')) if isinstance(data, dict) else ''
+        else:
+            result = parse_result_html(response.text)
+            if result:
+                return result
+            message = response.text[:200]
+
+        if 'captcha' in message.lower():
+            raise CaptchaRejected(message)
+        raise Exception(f"PNR enquiry failed: {message or 'unexpected response'}")
+
+    def reset_session(self):
+        """Drop the current thread's session so the next call starts fresh"""
+        # Not session.close() - that would also close the shared adapter
+        self._local.session = None
+
+    def check_pnr(self, pnr_number, max_retries=3):
+        """
+        Check PNR status over HTTP
+        Returns the PNR status information, or None if it could not be retrieved
+        """
+        print(f"Checking PNR {pnr_number} over HTTP...")
+        for attempt in range(max_retries):
+            try:
+                image_base64 = self.fetch_captcha()
+                answer, _, source = self.captcha_solver.solve_tracked(image_base64)
+                if not answer:
+                    print(f"Attempt {attempt + 1}: failed to solve CAPTCHA")
+                    continue
+                try:
+                    result = self.submit(pnr_number, answer)
+                except CaptchaRejected:
+                    self.captcha_solver.report(source, False, image_base64, answer)
+                    raise
+                self.captcha_solver.report(source, True, image_base64, answer)
+                print("✓ PNR status retrieved over HTTP")
+                return result
+            except CaptchaRejected:
+                print(f"Attempt {attempt + 1}: CAPTCHA was incorrect, retrying...")
+            except CircuitOpen as e:
+                print(f"HTTP enquiry skipped: {e}")
+                return None
+            except requests.RequestException as e:
+                print(f"Attempt {attempt + 1}: HTTP error: {e}")
+                self.reset_session()
+                if attempt < max_retries - 1:
+                    time.sleep(backoff_delay(attempt))
+            except Exception as e:
+                print(f"HTTP enquiry error: {e}")
+                return None
+        return None
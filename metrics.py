@@ -0,0 +1,190 @@
+"""
+Stage Timing Metrics
+Times each stage of a PNR check (driver setup, navigation, CAPTCHA capture,
+solving, submit, extraction, email) and aggregates the timings per PNR and
+per run. Spans can be streamed as JSON lines and the aggregates exported
+in Prometheus text format. Memory stays bounded in long-running processes:
+counts, sums and histogram buckets are running totals, percentiles come
+from a window of recent timings, and per-PNR totals are kept for the most
+recently checked PNRs only.
+"""
+
+import json
+import math
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Metrics:
+    def __init__(self, jsonl_path=None, window=10000, max_pnrs=10000):
+        """
+        Collect stage timings in memory
+
+        If jsonl_path is given, every finished span is also appended to it
+        as one JSON object per line. window is the number of recent timings
+        per stage that percentiles are computed from; per-stage totals for
+        at most max_pnrs PNRs are kept (least recently checked dropped).
+        """
+        self.max_pnrs = max_pnrs
+        self._lock = threading.Lock()
+        self._recent = defaultdict(lambda: deque(maxlen=window))
+        # stage -> [count, sum, max, bucket counts]
+        self._totals = {}
+        self._errors = defaultdict(int)
+        self._per_pnr = OrderedDict()
+        self._started = time.time()
+        self._file = open(jsonl_path, 'a', encoding='utf-8') if jsonl_path else None
+
+    @contextmanager
+    def span(self, stage, pnr_number=None, **fields):
+        """Time the enclosed block as one occurrence of stage"""
+        start = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - start, pnr_number, ok, **fields)
+
+    def record(self, stage, seconds, pnr_number=None, ok=True, **fields):
+        """Record one timing for stage"""
+        with self._lock:
+            self._recent[stage].append(seconds)
+            totals = self._totals.setdefault(stage, [0, 0.0, 0.0, [0] * len(BUCKETS)])
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] = max(totals[2], seconds)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    totals[3][i] += 1
+            if not ok:
+                self._errors[stage] += 1
+            if pnr_number is not None:
+                stages = self._per_pnr.get(pnr_number)
+                if stages is None:
+                    stages = self._per_pnr[pnr_number] = defaultdict(float)
+                    if len(self._per_pnr) > self.max_pnrs:
+                        self._per_pnr.popitem(last=False)
+                else:
+                    self._per_pnr.move_to_end(pnr_number)
+                stages[stage] += seconds
+            if self._file:
+                entry = {
+                    'ts': round(time.time(), 3),
+                    'stage': stage,
+                    'pnr': pnr_number,
+                    'seconds': round(seconds, 4),
+                    'ok': ok,
+                }
+                entry.update(fields)
+                self._file.write(json.dumps(entry) + '\n')
+                self._file.flush()
+
+    def durations(self, stage):
+        """The recent timings of stage (up to window of them), in seconds"""
+        with self._lock:
+            return list(self._recent.get(stage, []))
+
+    def summary(self):
+        """
+        Per-stage count, errors, total, mean, p50, p95 and max in seconds
+        p50/p95 cover the recent window; the rest cover the whole run
+        """
+        with self._lock:
+            recent = {stage: list(values) for stage, values in self._recent.items()}
+            totals = {stage: (values[0], values[1], values[2]) for stage, values in self._totals.items()}
+            errors = dict(self._errors)
+        stats = {}
+        for stage, (count, total, longest) in totals.items():
+            stats[stage] = {
+                'count': count,
+                'errors': errors.get(stage, 0),
+                'total': total,
+                'mean': total / count,
+                'p50': percentile(recent[stage], 0.50),
+                'p95': percentile(recent[stage], 0.95),
+                'max': longest,
+            }
+        return stats
+
+    def pnr_summary(self, pnr_number):
+        """Total seconds spent in each stage for one PNR"""
+        with self._lock:
+            return dict(self._per_pnr.get(pnr_number, {}))
+
+    def pop_pnr_summary(self, pnr_number):
+        """pnr_summary() that also forgets the PNR, for runs over very many PNRs"""
+        with self._lock:
+            return dict(self._per_pnr.pop(pnr_number, {}))
+
+    def prometheus_text(self, prefix='pnr_checker'):
+        """Export the stage timings as Prometheus histograms"""
+        with self._lock:
+            totals = {stage: (values[0], values[1], list(values[3])) for stage, values in self._totals.items()}
+            errors = dict(self._errors)
+
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent in each PNR check stage",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for stage in sorted(totals):
+            count, total, buckets = totals[stage]
+            for bound, bucket_count in zip(BUCKETS, buckets):
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {bucket_count}')
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {count}')
+
+        lines += [
+            f"# HELP {prefix}_stage_errors_total Stage executions that raised",
+            f"# TYPE {prefix}_stage_errors_total counter",
+        ]
+        for stage in sorted(totals):
+            lines.append(f'{prefix}_stage_errors_total{{stage="{stage}"}} {errors.get(stage, 0)}')
+
+        lines += [
+            f"# HELP {prefix}_run_seconds Wall-clock time of the current run",
+            f"# TYPE {prefix}_run_seconds gauge",
+            f"{prefix}_run_seconds {time.time() - self._started:.3f}",
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Write prometheus_text() to a file (e.g. for node_exporter's textfile collector)"""
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+
+    def print_summary(self):
+        """Print a per-stage timing table"""
+        stats = self.summary()
+        if not stats:
+            return
+        print(f"\n{'Stage':<18}{'Count':>7}{'Errors':>8}{'Mean':>9}{'p50':>9}{'p95':>9}{'Max':>9}")
+        print("-" * 69)
+        for stage, s in sorted(stats.items(), key=lambda item: -item[1]['total']):
+            print(f"{stage:<18}{s['count']:>7}{s['errors']:>8}{s['mean']:>8.2f}s"
+                  f"{s['p50']:>8.2f}s{s['p95']:>8.2f}s{s['max']:>8.2f}s")
+        print(f"Run time: {time.time() - self._started:.1f}s")
+
+    def close(self):
+        """Close the JSON lines file"""
+        if self._file:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,115 @@
+"""
+Background Notification Queue
+Delivers EmailNotifier calls from a worker thread so slow SMTP servers do
+not hold up PNR checks. Failed sends are retried with exponential backoff;
+a configuration error (missing credentials, rejected login) disables the
+queue instead, since no retry can succeed.
+"""
+
+import queue
+import threading
+import time
+
+
+_STOP = object()
+
+
+class NotificationQueue:
+    def __init__(self, notifier, maxsize=100, max_retries=3, backoff_seconds=5.0, metrics=None):
+        """
+        Start the delivery worker
+
+        notifier        - EmailNotifier used (only) by the worker thread, so its
+                          SMTP connection is never shared between threads
+        maxsize         - submit() blocks once this many notifications are waiting
+        max_retries     - extra attempts for a send that returned False or raised
+        backoff_seconds - delay before the first retry, doubled for each next one
+        metrics         - optional Metrics collector; each attempt is an 'email' span
+        """
+        self.notifier = notifier
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.metrics = metrics
+        self.stats = {'queued': 0, 'sent': 0, 'failed': 0, 'retries': 0, 'dropped': 0}
+        self.disabled = None   # reason, once the notifier reported a config_error
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._stats_lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name='notifier', daemon=True)
+        self._worker.start()
+
+    def submit(self, method_name, *args):
+        """
+        Queue a call such as submit('send_pnr_status', pnr, journey, passengers)
+        Once the queue is disabled the call is dropped instead of queued
+        """
+        if self.disabled:
+            self._count('dropped')
+            return
+        with self._stats_lock:
+            self.stats['queued'] += 1
+        self._queue.put((method_name, args))
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _deliver(self, method_name, args):
+        """Call the notifier method, retrying failures with backoff"""
+        method = getattr(self.notifier, method_name)
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count('retries')
+                delay = self.backoff_seconds * (2 ** (attempt - 1))
+                print(f"Retrying {method_name} in {delay:.0f}s (attempt {attempt + 1})...")
+                time.sleep(delay)
+            start = time.perf_counter()
+            sent = False
+            try:
+                sent = method(*args)
+            except Exception as e:
+                print(f"❌ Notification error in {method_name}: {e}")
+            if self.metrics:
+                pnr_number = args[0] if args else None
+                self.metrics.record('email', time.perf_counter() - start, pnr_number, ok=bool(sent))
+            if sent:
+                self._count('sent')
+                return
+            config_error = getattr(self.notifier, 'config_error', None)
+            if config_error:
+                # Retrying cannot fix the configuration
+                self.disabled = config_error
+                print(f"❌ Email notifications disabled: {config_error}")
+                break
+        self._count('failed')
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                if self.disabled:
+                    self._count('dropped')
+                else:
+                    self._deliver(*item)
+            finally:
+                self._queue.task_done()
+
+    def close(self):
+        """
+        Wait for every queued notification to be delivered, send the digest
+        if the notifier is in digest mode, and close the SMTP connection
+        Returns the delivery stats
+        """
+        if getattr(self.notifier, 'digest', False) and not self.disabled:
+            self.submit('send_digest')
+        self._queue.put(_STOP)
+        self._worker.join()
+        self.notifier.close()
+
+        stats = dict(self.stats)
+        print(f"Notifications: {stats['sent']} sent, {stats['failed']} failed, "
+              f"{stats['retries']} retries ({stats['queued']} queued)")
+        if self.disabled:
+            print(f"Notifications: {stats['dropped']} dropped - {self.disabled}")
+        return stats
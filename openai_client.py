@@ -0,0 +1,176 @@
+"""
+Shared Async OpenAI Client
+One AsyncOpenAI client running on a background event loop, shared by all
+PNR worker threads: a single keep-alive connection pool, a hard timeout per
+request, a hedged second request when the first is slow, and a cap on
+requests in flight.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from openai import AsyncOpenAI
+
+
+CAPTCHA_PROMPT = ("This is a CAPTCHA image containing a simple math equation. "
+                  "Please solve it and return ONLY the numeric answer, nothing else.")
+
+
+class AsyncOpenAIClient:
+    def __init__(self, api_key=None, model="gpt-4o", timeout=20.0, hedge_after=6.0, max_concurrency=4):
+        """
+        Start the event loop thread; the AsyncOpenAI client is created on first use
+
+        timeout         - hard limit in seconds for each request
+        hedge_after     - send a second, identical request if the first has not
+                          answered after this many seconds (0 = never hedge)
+        max_concurrency - requests in flight at once across all threads,
+                          hedged requests included
+        """
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.stats = {'calls': 0, 'requests': 0, 'hedged': 0, 'hedge_wins': 0, 'timeouts': 0, 'errors': 0}
+        self._stats_lock = threading.Lock()
+        self._client = None
+        self._semaphore = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='openai-client', daemon=True)
+        self._thread.start()
+        self.closed = False
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    async def _request(self, image_base64, model, started=None):
+        """
+        One chat completion call, bounded by the semaphore and the timeout
+        started, if given, is set once the request has a concurrency slot
+        """
+        if self._client is None:
+            # Created on the loop so the client and semaphore belong to it.
+            # The SDK's own retries are off - hedging replaces them.
+            self._client = AsyncOpenAI(api_key=self.api_key, timeout=self.timeout, max_retries=0)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            if started:
+                started.set()
+            self._count('requests')
+            try:
+                response = await asyncio.wait_for(self._client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": [
+                                {"type": "text", "text": CAPTCHA_PROMPT},
+                                {
+                                    "type": "image_url",
+                                    "image_url": {"url": f"data:image/png;base64,{image_base64}"}
+                                }
+                            ]
+                        }
+                    ],
+                    max_tokens=50
+                ), self.timeout)
+            except asyncio.TimeoutError:
+                self._count('timeouts')
+                raise TimeoutError(f"OpenAI request timed out after {self.timeout:.0f}s")
+            except Exception:
+                self._count('errors')
+                raise
+        return response.choices[0].message.content.strip()
+
+    async def _hedged(self, image_base64, model):
+        """Run the request, hedging it once; the first successful reply wins"""
+        started = asyncio.Event()
+        tasks = [asyncio.ensure_future(self._request(image_base64, model, started))]
+        try:
+            if self.hedge_after:
+                # Time the first request from when it is sent, not from
+                # when it started queueing for a slot
+                sent = asyncio.ensure_future(started.wait())
+                await asyncio.wait([tasks[0], sent], return_when=asyncio.FIRST_COMPLETED)
+                sent.cancel()
+                done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+                # Hedge only into spare capacity - never queue behind other calls
+                if not done and not self._semaphore.locked():
+                    self._count('hedged')
+                    tasks.append(asyncio.ensure_future(self._request(image_base64, model)))
+
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            self._count('hedge_wins')
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # The losing request (or both, if the caller gave up) is abandoned
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def complete(self, image_base64, model=None):
+        """
+        Ask the model (default: self.model) to solve a base64 PNG CAPTCHA
+        Safe to call from any thread. Returns the reply text; raises on
+        errors and timeouts
+        """
+        if self.closed:
+            raise RuntimeError("OpenAI client is closed")
+        self._count('calls')
+        future = asyncio.run_coroutine_threadsafe(self._hedged(image_base64, model or self.model), self._loop)
+        # Both hedged requests are individually bounded; this is a backstop
+        try:
+            return future.result(self.timeout + self.hedge_after + 5)
+        except FutureTimeoutError:
+            if future.done():
+                raise  # the request's own timeout
+            future.cancel()
+            raise TimeoutError(f"OpenAI request did not finish within {self.timeout + self.hedge_after:.0f}s")
+
+    def print_stats(self):
+        """Print request, hedge and timeout counts"""
+        stats = dict(self.stats)
+        if stats['calls']:
+            print(f"OpenAI: {stats['calls']} CAPTCHAs, {stats['requests']} requests, "
+                  f"{stats['hedged']} hedged ({stats['hedge_wins']} won by the hedge), "
+                  f"{stats['timeouts']} timeouts, {stats['errors']} errors")
+
+    def close(self):
+        """Close the connection pool and stop the event loop"""
+        if self.closed:
+            return
+        self.closed = True
+        if self._client is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self._client.close(), self._loop).result(5)
+            except Exception:
+                pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        if not self._thread.is_alive():
+            self._loop.close()
+
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+
+def shared_client(api_key=None):
+    """The process-wide default client, created on first use"""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None or _shared_client.closed:
+            _shared_client = AsyncOpenAIClient(api_key)
+        return _shared_client
+
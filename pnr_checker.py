@@ -1,6 +1,7 @@
 """
 PNR Status Checker for Indian Railways
-Uses Selenium for web automation and OpenAI API for CAPTCHA solving
+Uses Selenium for web automation and a local template solver or the
+OpenAI API for CAPTCHA solving
 """
 
 import time
@@ -10,40 +11,272 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import (
+    SessionNotCreatedException,
+    TimeoutException,
+    UnexpectedAlertPresentException,
+)
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from PIL import Image
 import openai
 import os
 from dotenv import load_dotenv
 from email_notifier import EmailNotifier
+from driver_pool import DriverPool
+from driver_resolver import resolve_chromedriver
+from connectivity import ConnectivityCheck, is_fatal
+from circuit_breaker import CircuitBreaker, CircuitOpen, backoff_delay
+from pnr_runner import PNRRunner, HostRateLimiter
+from captcha_solver import OpenAICaptchaSolver, build_captcha_solver, preprocess_captcha
+from captcha_flow import CaptchaFlow
+from captcha_cache import CaptchaAnswerCache
+from openai_client import AsyncOpenAIClient
+from http_client import PNRHttpClient
+from pnr_parser import journey_from_cells, passengers_from_rows
+from result_cache import ResultCache
+from status_history import StatusHistory, TRANSITION_TYPES
+from notification_queue import NotificationQueue
+from metrics import Metrics
+from scheduler import CheckScheduler
+from batch import run_batch
 import json
+import math
+import random
+import argparse
+import signal
+import threading
 
 # Load environment variables from .env file
 load_dotenv()
 
+ENQUIRY_URL = "https://www.indianrail.gov.in/enquiry/PNR/PnrEnquiry.html?locale=en"
+
+# Wait timeouts (seconds) used by check_pnr. Waits end as soon as the page
+# is ready; these only bound how long a slow page is given.
+TIMING_PROFILES = {
+    'fast': {
+        'element_timeout': 10,
+        'captcha_verify_timeout': 5,
+        'result_timeout': 10,
+        'poll_interval': 0.1,
+        'close_delay': 0,
+    },
+    'default': {
+        'element_timeout': 20,
+        'captcha_verify_timeout': 10,
+        'result_timeout': 20,
+        'poll_interval': 0.25,
+        'close_delay': 0,
+    },
+    'slow': {
+        'element_timeout': 40,
+        'captcha_verify_timeout': 20,
+        'result_timeout': 40,
+        'poll_interval': 0.5,
+        'close_delay': 2,
+    },
+}
+
+
+# Returns the tbody cell texts of each table argument (element or id) in
+# one round trip instead of a find_elements/.text call per row and cell
+TABLE_ROWS_SCRIPT = """
+return Array.prototype.map.call(arguments, function (table) {
+    if (typeof table === 'string') { table = document.getElementById(table); }
+    if (!table || !table.tBodies.length) { return null; }
+    return Array.prototype.map.call(table.tBodies[0].rows, function (row) {
+        return Array.prototype.map.call(row.cells, function (cell) {
+            return (cell.innerText || cell.textContent || '').replace(/\\s+/g, ' ').trim();
+        });
+    });
+});
+"""
+
+# Everything needed to tell an accepted CAPTCHA from a rejected one, in one
+# round trip: modal visibility, result rows, the image and any error line
+CAPTCHA_STATE_SCRIPT = """
+var modal = document.getElementById('firstCaptcha');
+var img = document.getElementById('CaptchaImgID');
+var text = modal ? (modal.innerText || '') : '';
+var error = text.match(/[^\\n]*(invalid|incorrect|wrong|not\\s+match)[^\\n]*/i);
+return {
+    modal: !!modal && modal.getClientRects().length > 0 && getComputedStyle(modal).visibility !== 'hidden',
+    results: document.querySelectorAll('#journeyDetailsTable tbody tr td').length > 0,
+    src: img ? img.src : null,
+    ready: !!img && img.complete && img.naturalWidth > 0,
+    error: error ? error[0].trim() : ''
+};
+"""
+
+# The CAPTCHA image bytes as a data URI without a screenshot: the src itself
+# when it is one, otherwise the already-decoded image redrawn on a canvas.
+# Re-fetching the URL is not an option - that would draw a new CAPTCHA.
+CAPTCHA_IMAGE_SCRIPT = """
+var img = document.getElementById('CaptchaImgID');
+if (!img || !img.complete || !img.naturalWidth) { return null; }
+if (img.src.indexOf('data:') === 0) { return img.src; }
+try {
+    var canvas = document.createElement('canvas');
+    canvas.width = img.naturalWidth;
+    canvas.height = img.naturalHeight;
+    canvas.getContext('2d').drawImage(img, 0, 0);
+    return canvas.toDataURL('image/png');
+} catch (e) {
+    return null;  // a cross-origin image taints the canvas
+}
+"""
+
+# Reload only the CAPTCHA image by cache-busting its URL; false for data URIs
+REFRESH_CAPTCHA_SCRIPT = """
+var img = document.getElementById('CaptchaImgID');
+if (!img || !img.src || img.src.indexOf('data:') === 0) { return false; }
+var url = new URL(img.src, document.baseURI);
+url.searchParams.set('_', Date.now());
+img.src = url.toString();
+return true;
+"""
+
+
+# Chrome settings. 'lean' keeps per-worker bandwidth, CPU and memory low;
+# 'full' is a regular desktop browser window
+BROWSER_PROFILES = {
+    'lean': {
+        'headless': True,
+        'maximized': False,
+        'window_size': '1024,768',
+        'page_load_strategy': 'eager',
+        'block_resources': True,
+    },
+    'full': {
+        'headless': False,
+        'maximized': True,
+        'window_size': '1920,1080',
+        'page_load_strategy': 'normal',
+        'block_resources': False,
+    },
+}
+
+# Requests the enquiry page does not need, blocked with Network.setBlockedURLs.
+# PNG is left alone because the CAPTCHA (captchaDraw.png) is one, and
+# stylesheets because the CAPTCHA modal's visibility depends on them.
+BLOCKED_URL_PATTERNS = [
+    '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico', '*.bmp',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp4', '*.webm', '*.mp3',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*facebook.net*', '*facebook.com/tr*', '*hotjar.com*',
+]
+
+
+def get_browser_profile(profile=None):
+    """
+    Resolve a browser profile
+
+    Accepts a profile name from BROWSER_PROFILES, or a dict whose keys
+    override the lean profile (a 'base' key selects another profile).
+    'blocked_urls' adds URL patterns to BLOCKED_URL_PATTERNS.
+    """
+    if profile is None:
+        profile = os.getenv('PNR_BROWSER_PROFILE', 'lean')
+    if isinstance(profile, str):
+        if profile not in BROWSER_PROFILES:
+            raise ValueError(f"Unknown browser profile: {profile}")
+        return dict(BROWSER_PROFILES[profile])
+    overrides = dict(profile)
+    browser = get_browser_profile(overrides.pop('base', 'lean'))
+    browser.update(overrides)
+    return browser
+
+
+def get_timing_profile(profile=None):
+    """
+    Resolve a timing profile
+
+    Accepts a profile name from TIMING_PROFILES, or a dict whose keys
+    override the default profile (a 'base' key selects another profile)
+    """
+    if profile is None:
+        profile = os.getenv('PNR_TIMING_PROFILE', 'default')
+    if isinstance(profile, str):
+        if profile not in TIMING_PROFILES:
+            raise ValueError(f"Unknown timing profile: {profile}")
+        return dict(TIMING_PROFILES[profile])
+    overrides = dict(profile)
+    timing = get_timing_profile(overrides.pop('base', 'default'))
+    timing.update(overrides)
+    return timing
+
 
 class PNRChecker:
-    def __init__(self, api_key):
-        """Initialize the PNR checker with OpenAI API key"""
+    def __init__(self, api_key, driver_pool=None, rate_limiter=None, timing_profile=None,
+                 captcha_solver=None, http_client=None, metrics=None,
+                 browser_fallback=True, enquiry_url=ENQUIRY_URL, connectivity=None, circuit_breaker=None,
+                 captcha_preprocess=True, browser_profile=None):
+        """
+        Initialize the PNR checker with OpenAI API key
+
+        If a DriverPool is given, browsers are borrowed from it and returned
+        after each check instead of being started and quit per PNR.
+        If a HostRateLimiter is given, page loads of the enquiry site wait
+        for it so parallel checkers do not burst requests.
+        timing_profile is a TIMING_PROFILES name or a dict of overrides.
+        captcha_solver is a CaptchaSolver; defaults to OpenAI Vision.
+        If a PNRHttpClient is given, each PNR is tried over plain HTTP first
+        and the browser is only used when that fails (unless browser_fallback
+        is False).
+        metrics is a shared Metrics collector for per-stage timings.
+        enquiry_url can point at a local mock site.
+        connectivity is a ConnectivityCheck shared by all workers so the
+        enquiry host is diagnosed once, not per PNR.
+        circuit_breaker is a CircuitBreaker shared by all workers (and the
+        HTTP client) so a failing site stops being contacted by all of them.
+        captcha_preprocess downscales and binarizes CAPTCHAs before solving.
+        browser_profile is a BROWSER_PROFILES name or a dict of overrides.
+        """
         self.api_key = api_key
         openai.api_key = api_key
+        self.driver_pool = driver_pool
+        self.rate_limiter = rate_limiter
+        self.timing = get_timing_profile(timing_profile)
+        self.browser = get_browser_profile(browser_profile)
+        self.captcha_solver = captcha_solver or OpenAICaptchaSolver(api_key)
+        self.http_client = http_client
+        self.metrics = metrics or Metrics()
+        self.browser_fallback = browser_fallback
+        self.enquiry_url = enquiry_url
+        self.connectivity = connectivity or ConnectivityCheck()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.captcha_preprocess = captcha_preprocess
         self.driver = None
         self.wait = None
         
-    def setup_driver(self):
-        """Setup Chrome WebDriver with appropriate options"""
+    def create_driver(self):
+        """Create a new Chrome WebDriver with appropriate options"""
         options = webdriver.ChromeOptions()
+        browser = self.browser
         
         # Check if running in CI/GitHub Actions environment
         is_ci = os.getenv('CI') == 'true' or os.getenv('GITHUB_ACTIONS') == 'true'
         
-        if is_ci:
-            # Headless mode for CI/GitHub Actions
+        if is_ci or browser['headless']:
             options.add_argument('--headless=new')
+            options.add_argument('--disable-gpu')
+        if is_ci:
+            # Containers in CI/GitHub Actions
             options.add_argument('--no-sandbox')
             options.add_argument('--disable-dev-shm-usage')
-            options.add_argument('--disable-gpu')
+        
+        # driver.get() returns at DOMContentLoaded; element waits cover the rest
+        options.page_load_strategy = browser['page_load_strategy']
+        
+        if browser['block_resources']:
+            # Skip background services a one-page scrape never needs
+            options.add_argument('--disable-background-networking')
+            options.add_argument('--disable-component-update')
+            options.add_argument('--disable-default-apps')
+            options.add_argument('--disable-sync')
+            options.add_argument('--mute-audio')
+            options.add_argument('--no-first-run')
         
         # Common options for both local and CI - make browser look more legitimate
         options.add_argument('--disable-blink-features=AutomationControlled')
@@ -51,9 +284,10 @@ class PNRChecker:
         options.add_argument('--disable-extensions')
         options.add_argument('--disable-popup-blocking')
         options.add_argument('--disable-notifications')
-        options.add_argument('--start-maximized')
+        if browser['maximized']:
+            options.add_argument('--start-maximized')
         options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-        options.add_argument('--window-size=1920,1080')
+        options.add_argument(f"--window-size={browser['window_size']}")
         options.add_argument('--lang=en-US,en')
         options.add_argument('--accept-lang=en-US,en')
         
@@ -68,99 +302,178 @@ class PNRChecker:
         options.add_experimental_option('useAutomationExtension', False)
         
         # Initialize driver
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=options)
+        try:
+            driver = webdriver.Chrome(service=Service(resolve_chromedriver()), options=options)
+        except SessionNotCreatedException as e:
+            # A cached driver stops matching Chrome after a browser update
+            if os.getenv('CHROMEDRIVER_PATH') or 'version' not in str(e).lower():
+                raise
+            print("Cached chromedriver does not match the installed Chrome, resolving again...")
+            driver = webdriver.Chrome(service=Service(resolve_chromedriver(refresh=True)), options=options)
         
         # Execute CDP commands to further mask automation
-        self.driver.execute_cdp_cmd('Network.setUserAgentOverride', {
+        driver.execute_cdp_cmd('Network.setUserAgentOverride', {
             "userAgent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         })
-        self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        # Register the webdriver mask for every new document so it survives
+        # navigation when the browser is reused from the pool
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+            "source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+        })
+        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         
-        self.wait = WebDriverWait(self.driver, 20)
+        if browser['block_resources']:
+            # Blocking applies to every later navigation of this browser
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {
+                "urls": BLOCKED_URL_PATTERNS + list(browser.get('blocked_urls', []))
+            })
+        
+        return driver
+    
+    def setup_driver(self):
+        """Get a WebDriver for this check - from the pool if one is configured"""
+        if self.driver_pool:
+            self.driver = self.driver_pool.acquire()
+        else:
+            self.driver = self.create_driver()
+        self.wait = self._waiter(self.timing['element_timeout'])
+    
+    def _waiter(self, timeout):
+        """Create a WebDriverWait using the profile's poll interval"""
+        return WebDriverWait(self.driver, timeout, poll_frequency=self.timing['poll_interval'])
+    
+    def wait_for_captcha_image(self, previous_src=None, timeout=None):
+        """
+        Wait until the CAPTCHA image has finished loading
+
+        When previous_src is given, also wait for the image to change so a
+        retry never re-reads the CAPTCHA that was just rejected
+        """
+        def image_ready(driver):
+            state = self.captcha_state()
+            if not state['ready']:
+                return False
+            if previous_src and state['src'] == previous_src:
+                return False
+            return state['src']
+        
+        waiter = self._waiter(timeout) if timeout else self.wait
+        return waiter.until(image_ready)
+    
+    def captcha_state(self):
+        """
+        Read the CAPTCHA modal state: modal, results, src, ready and error
+        A JavaScript alert is dismissed and its text returned as the error
+        """
+        try:
+            return self.driver.execute_script(CAPTCHA_STATE_SCRIPT)
+        except UnexpectedAlertPresentException as e:
+            try:
+                self.driver.switch_to.alert.dismiss()
+            except Exception:
+                pass  # Chrome dismisses it by default
+            return {'modal': True, 'results': False, 'src': None, 'ready': False,
+                    'error': e.alert_text or 'alert'}
+    
+    def wait_for_captcha_verdict(self, baseline):
+        """
+        Wait for the site to accept or reject the submitted CAPTCHA
+
+        baseline is captcha_state() from just before submitting; a new error
+        line or a new image means the answer was rejected.
+        Returns ('accepted' or 'rejected', state), or (None, state) if
+        neither happened within the verify timeout
+        """
+        def verdict(driver):
+            state = self.captcha_state()
+            if state['results'] or not state['modal']:
+                return 'accepted', state
+            if state['error'] and state['error'] != baseline['error']:
+                return 'rejected', state
+            if state['src'] and state['src'] != baseline['src']:
+                return 'rejected', state
+            return False
+        
+        try:
+            return self._waiter(self.timing['captcha_verify_timeout']).until(verdict)
+        except TimeoutException:
+            return None, self.captcha_state()
+    
+    def refresh_captcha_image(self):
+        """Load a new CAPTCHA image without reloading the page; False if not possible"""
+        return bool(self.driver.execute_script(REFRESH_CAPTCHA_SCRIPT))
+    
+    def reload_captcha_modal(self, pnr_number):
+        """Reload the enquiry page and reopen the CAPTCHA modal"""
+        self.open_enquiry_page(self.enquiry_url)
+        self.open_captcha_modal(pnr_number)
+    
+    def release_driver(self, failed=False):
+        """
+        Return the WebDriver to the pool, or quit it if there is no pool
+        After a failed check a browser that no longer responds is discarded
+        instead of being reset
+        """
+        if not self.driver:
+            return
+        if self.driver_pool:
+            crashed = failed and not DriverPool.is_alive(self.driver)
+            self.driver_pool.release(self.driver, discard=crashed)
+        else:
+            self.driver.quit()
+        self.driver = None
+        self.wait = None
         
     def solve_captcha_with_openai(self, image_base64):
         """
         Solve math CAPTCHA using OpenAI Vision API
         Returns the calculated answer
         """
-        try:
-            response = openai.chat.completions.create(
-                model="gpt-4o",  # or gpt-4-vision-preview
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": "This is a CAPTCHA image containing a simple math equation. Please solve it and return ONLY the numeric answer, nothing else."
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/png;base64,{image_base64}"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=50
-            )
-            
-            answer = response.choices[0].message.content.strip()
-            # Extract only numeric value
-            answer = ''.join(filter(str.isdigit, answer))
-            print(f"CAPTCHA solved: {answer}")
-            return answer
-            
-        except Exception as e:
-            print(f"Error solving CAPTCHA: {e}")
-            return None
+        answer, _ = OpenAICaptchaSolver(self.api_key).solve(image_base64)
+        return answer
     
     def capture_captcha_image(self):
-        """Capture CAPTCHA image and convert to base64"""
+        """
+        Capture the CAPTCHA image as base64, preprocessed for the solver
+        Uses the bytes behind the img src and only falls back to an element
+        screenshot when the browser cannot hand them over
+        """
         try:
-            # Wait for CAPTCHA image to load
-            captcha_img = self.wait.until(
-                EC.presence_of_element_located((By.ID, "CaptchaImgID"))
-            )
-            
-            # Get image source (base64 or URL)
-            img_src = captcha_img.get_attribute('src')
+            img_base64 = None
+            data_uri = self.driver.execute_script(CAPTCHA_IMAGE_SCRIPT)
+            if data_uri:
+                header, _, payload = data_uri.partition(',')
+                if header.endswith(';base64') and payload:
+                    img_base64 = payload
             
-            # Take screenshot of the element
-            img_bytes = captcha_img.screenshot_as_png
-            
-            # Convert to base64
-            img_base64 = base64.b64encode(img_bytes).decode('utf-8')
+            if not img_base64:
+                # Take screenshot of the element
+                captcha_img = self.wait.until(
+                    EC.presence_of_element_located((By.ID, "CaptchaImgID"))
+                )
+                img_base64 = base64.b64encode(captcha_img.screenshot_as_png).decode('utf-8')
             
+            if self.captcha_preprocess:
+                img_base64 = preprocess_captcha(img_base64)
             return img_base64
             
         except Exception as e:
             print(f"Error capturing CAPTCHA: {e}")
             return None
     
+    def read_table_rows(self, *tables):
+        """
+        Read the tbody cell texts of several tables in one WebDriver call
+        Tables may be WebElements or element IDs; missing tables give None
+        """
+        return self.driver.execute_script(TABLE_ROWS_SCRIPT, *tables)
+    
     def parse_journey_table(self, table_element):
         """Parse the journey details table"""
         try:
-            rows = table_element.find_elements(By.TAG_NAME, "tr")
-            
-            # Get data from tbody
-            data_row = table_element.find_element(By.TAG_NAME, "tbody").find_element(By.TAG_NAME, "tr")
-            cells = data_row.find_elements(By.TAG_NAME, "td")
-            
-            journey_details = {
-                'train_number': cells[0].text,
-                'train_name': cells[1].text,
-                'boarding_date': cells[2].text,
-                'from': cells[3].text,
-                'to': cells[4].text,
-                'reserved_upto': cells[5].text,
-                'boarding_point': cells[6].text,
-                'class': cells[7].text
-            }
-            
-            return journey_details
+            rows = self.read_table_rows(table_element)[0]
+            return journey_from_cells(rows[0])
             
         except Exception as e:
             print(f"Error parsing journey table: {e}")
@@ -169,26 +482,23 @@ class PNRChecker:
     def parse_passenger_table(self, table_element):
         """Parse the passenger details table"""
         try:
-            tbody = table_element.find_element(By.TAG_NAME, "tbody")
-            rows = tbody.find_elements(By.TAG_NAME, "tr")
-            
-            passengers = []
-            for row in rows:
-                cells = row.find_elements(By.TAG_NAME, "td")
-                passenger = {
-                    'passenger_no': cells[0].text,
-                    'booking_status': cells[1].text,
-                    'current_status': cells[2].text,
-                    'coach_position': cells[3].text if len(cells) > 3 else ''
-                }
-                passengers.append(passenger)
-            
-            return passengers
+            rows = self.read_table_rows(table_element)[0]
+            return passengers_from_rows(rows)
             
         except Exception as e:
             print(f"Error parsing passenger table: {e}")
             return None
     
+    def extract_results(self):
+        """
+        Parse both result tables from a single DOM snapshot
+        Returns (journey_details, passenger_details)
+        """
+        journey_rows, passenger_rows = self.read_table_rows("journeyDetailsTable", "psgnDetailsTable")
+        if not journey_rows:
+            raise Exception("Journey details table is empty")
+        return journey_from_cells(journey_rows[0]), passengers_from_rows(passenger_rows or [])
+    
     def display_results(self, journey_data, passenger_data):
         """Display the extracted results in a formatted way"""
         print("\n" + "="*80)
@@ -219,177 +529,193 @@ class PNRChecker:
         
         print("\n" + "="*80 + "\n")
     
+    def open_enquiry_page(self, url):
+        """
+        Load the enquiry page, retrying connection failures
+
+        Page loads go through the shared circuit breaker, so once the site
+        keeps failing every worker stops trying until a probe succeeds.
+        Reachability comes from the shared ConnectivityCheck: a fresh DNS or
+        refused diagnosis (e.g. the one made at startup) fails without a
+        page load, and a failed load is diagnosed unless a fresh fatal
+        diagnosis already explains it. DNS failures and refused connections
+        open the circuit at once, other failures are retried with
+        exponential backoff. Behind a proxy the diagnosis only picks the
+        backoff (see connectivity.is_fatal).
+        """
+        health = self.connectivity.status(url)
+        if health and is_fatal(health):
+            self.circuit_breaker.trip()
+            raise Exception(self._connection_error(health, "host was not reachable when last checked"))
+        
+        # Try to navigate with retries for connection issues
+        print(f"Attempting to access Indian Railways website...")
+        for attempt in range(3):
+            failed_at = time.time()
+            try:
+                if self.rate_limiter:
+                    self.rate_limiter.wait(url)
+                with self.circuit_breaker.guard():
+                    self.driver.get(url)
+                print(f"✓ Successfully loaded the website (attempt {attempt + 1})")
+                break
+            except CircuitOpen:
+                raise
+            except Exception as e:
+                error_msg = str(e)
+                print(f"✗ Connection attempt {attempt + 1} failed: {error_msg}")
+                health = self.connectivity.status(url)
+                if not health or health['ok']:
+                    # A diagnosis from before the failure says nothing about it
+                    health = self.connectivity.check(url, newer_than=failed_at)
+                if is_fatal(health):
+                    self.circuit_breaker.trip()
+                
+                if attempt < 2 and not is_fatal(health):
+                    # Host answers: the page load itself glitched, retry soon.
+                    # Host silent: give the network longer to recover.
+                    wait_time = backoff_delay(attempt, base=1 if health['ok'] else 5)
+                    print(f"Waiting {wait_time:.1f} seconds before retry...")
+                    time.sleep(wait_time)
+                else:
+                    # Take a screenshot for debugging
+                    try:
+                        self.driver.save_screenshot("connection_error.png")
+                        print("Screenshot saved as connection_error.png")
+                    except:
+                        pass
+                    raise Exception(self._connection_error(health, error_msg))
+    
+    @staticmethod
+    def _connection_error(health, error_msg):
+        """Explain a failed page load using the connectivity diagnosis"""
+        if health['reason'] == 'refused' or "ERR_CONNECTION_REFUSED" in error_msg:
+            return (
+                "Connection refused by Indian Railways website. "
+                "This typically means:\n"
+                "1. The website is blocking GitHub Actions IP addresses (datacenter IPs)\n"
+                "2. The website may have geographic restrictions (India-only access)\n"
+                "3. The website's firewall is blocking automated requests\n"
+                f"Original error: {error_msg}"
+            )
+        if health['reason'] == 'dns' or "ERR_NAME_NOT_RESOLVED" in error_msg:
+            return f"DNS resolution failed. The domain may be blocked. Error: {error_msg}"
+        if not health['ok']:
+            return f"{health['host']} is not reachable ({health['reason']}: {health['detail']}). Error: {error_msg}"
+        return f"Failed to connect after 3 attempts. Error: {error_msg}"
+    
+    def open_captcha_modal(self, pnr_number):
+        """Enter the PNR number and open the CAPTCHA modal"""
+        # Step 1: Enter PNR number once the input is usable
+        print("Entering PNR number...")
+        pnr_input = self.wait.until(
+            EC.element_to_be_clickable((By.ID, "inputPnrNo"))
+        )
+        pnr_input.clear()
+        pnr_input.send_keys(pnr_number)
+        print(f"PNR {pnr_number} entered")
+        
+        # Step 2: Click first submit button
+        print("Clicking submit button...")
+        submit_btn = self.wait.until(
+            EC.element_to_be_clickable((By.ID, "modal1"))
+        )
+        submit_btn.click()
+        
+        # Step 3: Wait for modal to appear
+        print("Waiting for CAPTCHA modal...")
+        self.wait.until(
+            EC.visibility_of_element_located((By.ID, "firstCaptcha"))
+        )
+        print("Modal appeared")
+    
+    def enter_captcha_answer(self, answer):
+        """Enter the CAPTCHA answer and submit it"""
+        # Step 5: Enter CAPTCHA answer
+        print(f"Entering CAPTCHA answer: {answer}")
+        captcha_input = self.wait.until(
+            EC.presence_of_element_located((By.ID, "inputCaptcha"))
+        )
+        captcha_input.clear()
+        captcha_input.send_keys(answer)
+        
+        # Step 6: Click final submit button
+        print("Clicking final submit button...")
+        final_submit = self.wait.until(
+            EC.element_to_be_clickable((By.ID, "submitPnrNo"))
+        )
+        final_submit.click()
+    
+    def clear_captcha_input(self):
+        """Clear a rejected answer from the CAPTCHA input"""
+        for captcha_input in self.driver.find_elements(By.ID, "inputCaptcha"):
+            captcha_input.clear()
+    
     def check_pnr(self, pnr_number, max_retries=3):
         """
         Main method to check PNR status
         Returns the PNR status information
         """
+        start = time.perf_counter()
+        result = self._check_pnr(pnr_number, max_retries)
+        self.metrics.record('check_pnr', time.perf_counter() - start, pnr_number, ok=result is not None)
+        return result
+    
+    def _check_pnr(self, pnr_number, max_retries):
+        """Run one PNR check, recording a timing span for every stage"""
+        span = self.metrics.span
+        
+        if self.http_client:
+            with span('http_check', pnr_number):
+                result = self.http_client.check_pnr(pnr_number, max_retries)
+            if result:
+                self.display_results(result['journey_details'], result['passenger_details'])
+                return result
+            if not self.browser_fallback:
+                return None
+            print("HTTP enquiry failed, falling back to browser...")
+        
+        # Fail fast, before taking a browser, while the site is known to be down
+        self.circuit_breaker.check(probe=False)
+        
+        failed = False
         try:
             print(f"Checking PNR: {pnr_number}")
             
             # Setup driver
-            self.setup_driver()
+            with span('setup_driver', pnr_number):
+                self.setup_driver()
             
             # Navigate to the website
-            url = "https://www.indianrail.gov.in/enquiry/PNR/PnrEnquiry.html?locale=en"
+            url = self.enquiry_url
             print(f"Navigating to {url}")
+            with span('navigation', pnr_number):
+                self.open_enquiry_page(url)
             
-            # First, test basic connectivity
-            print("Testing network connectivity...")
-            try:
-                # Try to access a simple page first to verify network works
-                self.driver.get("https://www.google.com")
-                print("✓ Basic internet connectivity confirmed")
-                time.sleep(2)
-            except Exception as e:
-                print(f"✗ Basic connectivity test failed: {e}")
-                raise Exception("Network connectivity issue in GitHub Actions environment")
-            
-            # Try to navigate with retries for connection issues
-            print(f"Attempting to access Indian Railways website...")
-            for attempt in range(3):
-                try:
-                    self.driver.get(url)
-                    print(f"✓ Successfully loaded the website (attempt {attempt + 1})")
-                    break
-                except Exception as e:
-                    error_msg = str(e)
-                    print(f"✗ Connection attempt {attempt + 1} failed: {error_msg}")
-                    
-                    if attempt < 2:
-                        wait_time = 5 * (attempt + 1)
-                        print(f"Waiting {wait_time} seconds before retry...")
-                        time.sleep(wait_time)
-                    else:
-                        # Take a screenshot for debugging
-                        try:
-                            self.driver.save_screenshot("connection_error.png")
-                            print("Screenshot saved as connection_error.png")
-                        except:
-                            pass
-                        
-                        # Provide detailed error message
-                        if "ERR_CONNECTION_REFUSED" in error_msg:
-                            raise Exception(
-                                "Connection refused by Indian Railways website. "
-                                "This typically means:\n"
-                                "1. The website is blocking GitHub Actions IP addresses (datacenter IPs)\n"
-                                "2. The website may have geographic restrictions (India-only access)\n"
-                                "3. The website's firewall is blocking automated requests\n"
-                                f"Original error: {error_msg}"
-                            )
-                        elif "ERR_NAME_NOT_RESOLVED" in error_msg:
-                            raise Exception(f"DNS resolution failed. The domain may be blocked. Error: {error_msg}")
-                        else:
-                            raise Exception(f"Failed to connect after 3 attempts. Error: {error_msg}")
-            
-            # Wait for page to load
-            time.sleep(2)
-            
-            # Step 1: Enter PNR number
-            print("Entering PNR number...")
-            pnr_input = self.wait.until(
-                EC.presence_of_element_located((By.ID, "inputPnrNo"))
-            )
-            pnr_input.clear()
-            pnr_input.send_keys(pnr_number)
-            print(f"PNR {pnr_number} entered")
-            
-            # Step 2: Click first submit button
-            print("Clicking submit button...")
-            submit_btn = self.wait.until(
-                EC.element_to_be_clickable((By.ID, "modal1"))
-            )
-            submit_btn.click()
-            
-            # Step 3: Wait for modal to appear
-            print("Waiting for CAPTCHA modal...")
-            modal = self.wait.until(
-                EC.visibility_of_element_located((By.ID, "firstCaptcha"))
-            )
-            print("Modal appeared")
-            
-            # Step 4: Capture and solve CAPTCHA
-            retry_count = 0
-            captcha_solved = False
+            with span('pnr_entry', pnr_number):
+                self.open_captcha_modal(pnr_number)
             
-            while retry_count < max_retries and not captcha_solved:
-                print(f"Attempt {retry_count + 1} to solve CAPTCHA...")
-                
-                # Capture CAPTCHA image
-                time.sleep(1)  # Wait for image to fully load
-                captcha_base64 = self.capture_captcha_image()
-                
-                if not captcha_base64:
-                    print("Failed to capture CAPTCHA image")
-                    retry_count += 1
-                    continue
-                
-                # Solve CAPTCHA using OpenAI
-                answer = self.solve_captcha_with_openai(captcha_base64)
-                
-                if not answer:
-                    print("Failed to solve CAPTCHA")
-                    retry_count += 1
-                    continue
-                
-                # Step 5: Enter CAPTCHA answer
-                print(f"Entering CAPTCHA answer: {answer}")
-                captcha_input = self.wait.until(
-                    EC.presence_of_element_located((By.ID, "inputCaptcha"))
-                )
-                captcha_input.clear()
-                captcha_input.send_keys(answer)
-                
-                # Step 6: Click final submit button
-                print("Clicking final submit button...")
-                final_submit = self.wait.until(
-                    EC.element_to_be_clickable((By.ID, "submitPnrNo"))
-                )
-                final_submit.click()
-                
-                # Wait a bit to see if CAPTCHA was correct
-                time.sleep(3)
-                
-                # Check if modal is still visible (means wrong CAPTCHA)
-                try:
-                    modal_still_visible = self.driver.find_element(By.ID, "firstCaptcha").is_displayed()
-                    if modal_still_visible:
-                        print("CAPTCHA was incorrect, retrying...")
-                        retry_count += 1
-                        # Clear the input for next attempt
-                        captcha_input.clear()
-                    else:
-                        captcha_solved = True
-                        print("CAPTCHA solved successfully!")
-                except:
-                    # Modal not visible means success
-                    captcha_solved = True
-                    print("CAPTCHA solved successfully!")
-            
-            if not captcha_solved:
-                print("Failed to solve CAPTCHA after maximum retries")
+            # Step 4: Capture, solve and submit the CAPTCHA
+            if not CaptchaFlow(self, pnr_number, max_retries).run():
                 return None
             
             # Step 7: Extract results
             print("Extracting PNR status...")
-            time.sleep(3)  # Wait for results to load
             
             # Try to find the results section
             try:
-                # Extract Journey Details Table
-                journey_table = self.wait.until(
-                    EC.presence_of_element_located((By.ID, "journeyDetailsTable"))
-                )
-                
-                # Extract Passenger Details Table
-                passenger_table = self.wait.until(
-                    EC.presence_of_element_located((By.ID, "psgnDetailsTable"))
-                )
-                
-                # Parse the tables
-                journey_data = self.parse_journey_table(journey_table)
-                passenger_data = self.parse_passenger_table(passenger_table)
+                with span('extract', pnr_number):
+                    # Wait until both tables have data rows rendered
+                    result_wait = self._waiter(self.timing['result_timeout'])
+                    result_wait.until(EC.presence_of_element_located(
+                        (By.CSS_SELECTOR, "#journeyDetailsTable tbody tr td")
+                    ))
+                    result_wait.until(EC.presence_of_element_located(
+                        (By.CSS_SELECTOR, "#psgnDetailsTable tbody tr td")
+                    ))
+                    
+                    # Parse both tables in one round trip
+                    journey_data, passenger_data = self.extract_results()
                 
                 # Display the results
                 self.display_results(journey_data, passenger_data)
@@ -408,7 +734,10 @@ class PNRChecker:
                 # Return page source for manual parsing
                 return None
             
+        except CircuitOpen:
+            raise
         except Exception as e:
+            failed = True
             print(f"Error during PNR check: {e}")
             if self.driver:
                 self.driver.save_screenshot("error_screenshot.png")
@@ -419,23 +748,80 @@ class PNRChecker:
             # Cleanup
             if self.driver:
                 print("Closing browser...")
-                time.sleep(2)  # Give time to see results
-                self.driver.quit()
+                if self.timing['close_delay']:
+                    time.sleep(self.timing['close_delay'])  # Give time to see results
+                self.release_driver(failed)
 
+def run_daemon(config, pnr_numbers, runner, handle_outcome, cache=None, notifications=None, metrics=None):
+    """
+    Check each PNR whenever it falls due until every journey is over
+    or the process is interrupted (Ctrl+C / SIGTERM)
 
-def main():
-    """Main function to run the PNR checker"""
+    After every batch the timing summary is printed and, if configured,
+    the Prometheus file is rewritten, so a long-running daemon stays
+    observable.
+    """
+    scheduler_config = config.get('scheduler', {})
+    scheduler = CheckScheduler(
+        ttl_hours=config.get('result_cache', {}).get('ttl_hours'),
+        jitter=scheduler_config.get('jitter', 0.1),
+        retry_minutes=scheduler_config.get('retry_minutes', 15),
+        startup_spread_seconds=scheduler_config.get('startup_spread_seconds', 60),
+        max_batch=runner.max_concurrency
+    )
     
-    # Get OpenAI API key from environment variable
-    api_key = os.getenv('OPENAI_API_KEY')
+    # Resume from the cache: a fresh result is next due when it expires
+    now = time.time()
+    for pnr_number in pnr_numbers:
+        expires_at = cache.expires_at(pnr_number) if cache else None
+        if expires_at == math.inf:
+            print(f"ℹ️ PNR {pnr_number}: journey is over, not scheduled")
+        elif expires_at and expires_at > now:
+            scheduler.add(pnr_number, expires_at + random.uniform(0, scheduler.startup_spread_seconds))
+        else:
+            scheduler.add(pnr_number)
     
-    if not api_key:
-        print("ERROR: Please set OPENAI_API_KEY environment variable")
-        print("You can set it by running: $env:OPENAI_API_KEY='your-api-key-here'")
-        return
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
     
-    # Check if running in automation mode (send emails)
-    send_email = os.getenv('SEND_EMAIL', 'false').lower() == 'true'
+    prometheus_path = config.get('metrics', {}).get('prometheus_path')
+    
+    def on_batch(outcomes):
+        # Digest mode: one email per batch rather than one at exit
+        if notifications and getattr(notifications.notifier, 'digest', False):
+            notifications.submit('send_digest')
+        if metrics:
+            metrics.print_summary()
+            if prometheus_path:
+                metrics.write_prometheus(prometheus_path)
+    
+    print(f"Scheduler started with {len(scheduler)} PNR(s)")
+    try:
+        scheduler.run(runner, on_result=handle_outcome, stop_event=stop_event, on_batch=on_batch)
+    except KeyboardInterrupt:
+        print("\nScheduler interrupted")
+    if stop_event.is_set():
+        print("Scheduler stopped")
+
+
+def main(argv=None):
+    """Main function to run the PNR checker"""
+    parser = argparse.ArgumentParser(description="Check Indian Railways PNR status")
+    parser.add_argument('--daemon', action='store_true',
+                        help="keep running and re-check each PNR when it is due, instead of checking all once")
+    parser.add_argument('--input', metavar='PATH',
+                        help="check the PNRs of a CSV/JSONL file ('-' for stdin) instead of config.json")
+    parser.add_argument('--input-format', choices=('csv', 'jsonl'),
+                        help="format of --input (default: from the file extension, csv for stdin)")
+    parser.add_argument('--output', metavar='PATH', default='pnr_results.jsonl',
+                        help="JSONL file the --input results are appended to (default: %(default)s)")
+    parser.add_argument('--checkpoint', metavar='PATH',
+                        help="resume state of --input runs (default: OUTPUT.checkpoint)")
+    parser.add_argument('--max-pending', type=int, metavar='N',
+                        help="PNRs of --input read ahead of finished checks (default: 2 x max_concurrency)")
+    args = parser.parse_args(argv)
+    if args.daemon and args.input:
+        parser.error("--daemon and --input cannot be combined")
     
     # Load PNR numbers from config or use default
     config_file = 'config.json'
@@ -444,56 +830,226 @@ def main():
             config = json.load(f)
             pnr_numbers = config.get('pnr_numbers', ["2244293725"])
     else:
+        config = {}
         pnr_numbers = ["2244293725"]
     
-    # Create checker instance
-    checker = PNRChecker(api_key)
+    # Get OpenAI API key from environment variable (not needed for the local solver)
+    api_key = os.getenv('OPENAI_API_KEY')
     
-    # Create email notifier if needed
-    if send_email:
-        notifier = EmailNotifier()
+    if not api_key and config.get('captcha_solver', 'auto') != 'local':
+        print("ERROR: Please set OPENAI_API_KEY environment variable")
+        print("You can set it by running: $env:OPENAI_API_KEY='your-api-key-here'")
+        return
     
-    # Check each PNR
-    for pnr_number in pnr_numbers:
-        print(f"\n{'='*80}")
-        print(f"Processing PNR: {pnr_number}")
-        print(f"{'='*80}")
-        
+    # Check if running in automation mode (send emails)
+    send_email = os.getenv('SEND_EMAIL', 'false').lower() == 'true'
+    
+    # Stage timings shared by all workers
+    metrics_config = config.get('metrics', {})
+    metrics = Metrics(metrics_config.get('jsonl_path'))
+    
+    # Resolve chromedriver once up front rather than on the first browser start
+    if config.get('backend', 'browser') == 'browser':
         try:
-            # Check PNR status
-            result = checker.check_pnr(pnr_number)
-            
+            resolve_chromedriver()
+        except Exception as e:
+            print(f"❌ Could not resolve chromedriver: {e}")
+    
+    # Pool of reusable browsers shared by all workers - one per worker at least
+    max_concurrency = max(1, int(config.get('max_concurrency', 1)))
+    driver_pool = DriverPool(
+        PNRChecker(api_key, browser_profile=config.get('browser_profile')).create_driver,
+        size=max(int(config.get('driver_pool_size', 1)), max_concurrency),
+        max_uses=config.get('driver_max_uses', 25)
+    )
+    rate_limiter = HostRateLimiter(config.get('min_request_interval_seconds', 2.0))
+    # Diagnose the enquiry host once up front; workers reuse the result and
+    # only re-check it after a failed page load
+    connectivity = ConnectivityCheck()
+    health = connectivity.check(ENQUIRY_URL)
+    # One breaker for the site, shared by every worker and the HTTP client
+    breaker_config = config.get('circuit_breaker', {})
+    circuit_breaker = CircuitBreaker(
+        'indianrail.gov.in',
+        failure_threshold=breaker_config.get('failure_threshold', 5),
+        reset_timeout=breaker_config.get('reset_seconds', 30),
+        max_reset_timeout=breaker_config.get('max_reset_seconds', 600)
+    )
+    # No page load can succeed against a host that does not resolve or refuses
+    # (unless a proxy reaches it for us)
+    if is_fatal(health):
+        circuit_breaker.trip()
+    # Verified answers of CAPTCHAs seen before skip the solver
+    captcha_cache_config = config.get('captcha_cache', {})
+    answer_cache = None
+    if captcha_cache_config.get('enabled', True):
+        answer_cache = CaptchaAnswerCache(
+            captcha_cache_config.get('path', 'captcha_cache.db'),
+            max_entries=captcha_cache_config.get('max_entries', 5000),
+            max_distance=captcha_cache_config.get('max_distance', 3)
+        )
+    # One OpenAI connection pool for all workers, with timeouts and hedging
+    openai_config = config.get('openai', {})
+    openai_client = None
+    if config.get('captcha_solver', 'auto') != 'local':
+        openai_client = AsyncOpenAIClient(
+            api_key,
+            model=openai_config.get('model', 'gpt-4o'),
+            timeout=openai_config.get('timeout_seconds', 20),
+            hedge_after=openai_config.get('hedge_after_seconds', 6),
+            max_concurrency=openai_config.get('max_concurrency', max(4, max_concurrency))
+        )
+    captcha_solver = build_captcha_solver(
+        api_key,
+        mode=config.get('captcha_solver', 'auto'),
+        templates_dir=config.get('captcha_templates_dir', 'captcha_templates'),
+        min_confidence=config.get('captcha_min_confidence', 0.85),
+        answer_cache=answer_cache,
+        openai_client=openai_client
+    )
+    http_client = None
+    if config.get('backend', 'browser') == 'http':
+        http_client = PNRHttpClient(
+            captcha_solver,
+            pool_size=max_concurrency,
+            rate_limiter=rate_limiter,
+            preprocess=config.get('captcha_preprocess', True),
+            circuit_breaker=circuit_breaker
+        )
+    runner = PNRRunner(
+        lambda: PNRChecker(
+            api_key,
+            driver_pool=driver_pool,
+            rate_limiter=rate_limiter,
+            timing_profile=config.get('timing_profile'),
+            captcha_solver=captcha_solver,
+            http_client=http_client,
+            metrics=metrics,
+            connectivity=connectivity,
+            circuit_breaker=circuit_breaker,
+            captcha_preprocess=config.get('captcha_preprocess', True)
+        ),
+        max_concurrency=max_concurrency
+    )
+    
+    # Email delivery runs on a background queue so SMTP never blocks checks
+    notifications = None
+    if send_email:
+        notifications = NotificationQueue(
+            EmailNotifier(digest=config.get('email_digest', False)),
+            maxsize=config.get('notification_queue_size', 100),
+            max_retries=config.get('notification_retries', 3),
+            metrics=metrics
+        )
+    
+    # Skip PNRs whose cached result is still fresh
+    cache_config = config.get('result_cache', {})
+    cache = None
+    cached = {}
+    if cache_config.get('enabled', True):
+        cache = ResultCache(cache_config.get('path', 'pnr_cache.db'), cache_config.get('ttl_hours'))
+    if cache and not (args.daemon or args.input):
+        for pnr_number in pnr_numbers:
+            result = cache.get(pnr_number)
             if result:
-                print("\n✅ PNR check completed successfully!")
-                
-                # Send email notification if enabled
-                if send_email:
-                    print("\nSending email notification...")
-                    email_sent = notifier.send_pnr_status(
-                        pnr_number,
-                        result.get('journey_details'),
-                        result.get('passenger_details')
-                    )
-                    if email_sent:
-                        print("✅ Email notification sent!")
-                    else:
-                        print("❌ Failed to send email notification")
-            else:
-                print("\n❌ PNR check failed!")
-                
-                # Send error notification if email is enabled
-                if send_email:
-                    notifier.send_error_notification(
-                        pnr_number,
-                        "Failed to retrieve PNR status. The system will retry on the next scheduled run."
-                    )
+                cached[pnr_number] = result
+        for pnr_number in cached:
+            print(f"ℹ️ PNR {pnr_number} unchanged since last check (cached), skipping")
+    
+    # Status history for change detection
+    history_config = config.get('change_detection', {})
+    history = None
+    notify_on = set(history_config.get('notify_on', TRANSITION_TYPES))
+    if history_config.get('enabled', True):
+        history = StatusHistory(history_config.get('path', 'pnr_history.db'))
+    
+    def handle_outcome(outcome):
+        """Store a finished check and queue its notification"""
+        pnr_number = outcome['pnr_number']
+        result = outcome['result']
         
-        except Exception as e:
-            print(f"\n❌ Error processing PNR {pnr_number}: {e}")
+        if result and cache:
+            cache.put(pnr_number, result)
+        
+        # Only notify on configured status transitions
+        changes = None
+        notify = True
+        if result and history:
+            changes = history.record(pnr_number, result)
+            notify = any(change['type'] in notify_on for change in changes)
+            for change in changes:
+                if change['type'] != 'new':
+                    print(f"  {pnr_number} {change['passenger_no']}: {change['old']} → {change['new']} ({change['type']})")
+        
+        if outcome['error']:
+            # Send error notification if email is enabled
+            if notifications:
+                notifications.submit('send_error_notification', pnr_number, outcome['error'])
+        
+        elif result:
+            print(f"\n✅ PNR {pnr_number} check completed successfully!")
+            
+            # Send email notification if enabled
+            if notifications and not notify:
+                print("No status change worth notifying, skipping email")
+            elif notifications:
+                print("Queueing email notification...")
+                notifications.submit(
+                    'send_pnr_status',
+                    pnr_number,
+                    result.get('journey_details'),
+                    result.get('passenger_details'),
+                    changes
+                )
+        else:
+            print(f"\n❌ PNR {pnr_number} check failed!")
             
             # Send error notification if email is enabled
-            if send_email:
-                notifier.send_error_notification(pnr_number, str(e))
+            if notifications:
+                notifications.submit(
+                    'send_error_notification',
+                    pnr_number,
+                    "Failed to retrieve PNR status. The system will retry on the next scheduled run."
+                )
+    
+    # Check all PNRs; each result is handled as soon as its check finishes
+    try:
+        if args.daemon:
+            run_daemon(config, pnr_numbers, runner, handle_outcome, cache, notifications, metrics)
+        elif args.input:
+            run_batch(runner, args.input, args.output, args.checkpoint, args.input_format,
+                      args.max_pending, on_result=handle_outcome, cache=cache, metrics=metrics,
+                      circuit_breaker=circuit_breaker)
+        else:
+            runner.run([pnr for pnr in pnr_numbers if pnr not in cached], on_result=handle_outcome)
+    finally:
+        driver_pool.close()
+        
+        # Deliver everything still queued before exiting
+        if notifications:
+            print("\nWaiting for email notifications to be delivered...")
+            notifications.close()
+        
+        if cache:
+            cache.close()
+        if history:
+            history.close()
+        if answer_cache is not None:
+            answer_cache.close()
+        if openai_client:
+            openai_client.print_stats()
+            openai_client.close()
+        
+        if circuit_breaker.stats['opened']:
+            print(f"Circuit breaker: opened {circuit_breaker.stats['opened']} time(s), "
+                  f"{circuit_breaker.stats['rejected']} request(s) skipped, {circuit_breaker.stats['probes']} probe(s)")
+        
+        # Per-run timing and CAPTCHA solver accuracy report
+        metrics.print_summary()
+        captcha_solver.stats.print_summary()
+        if metrics_config.get('prometheus_path'):
+            metrics.write_prometheus(metrics_config['prometheus_path'])
+        metrics.close()
     
     print(f"\n{'='*80}")
     print("All PNR checks completed!")
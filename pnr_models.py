@@ -0,0 +1,160 @@
+"""
+PNR Result Models
+Typed, slotted records for journey and passenger details with the status
+code, WL/RAC position and boarding date parsed once. They convert to and
+from the journey_details/passenger_details dicts used by the checker and
+serialize to compact positional JSON for storage.
+"""
+
+import json
+from dataclasses import dataclass
+from datetime import date
+from enum import Enum
+from typing import Optional, Tuple
+from pnr_parser import JOURNEY_FIELDS, parse_boarding_date, status_category, status_position
+
+
+class Status(str, Enum):
+    """Booking status code, as returned by status_category"""
+    CNF = 'CNF'
+    RAC = 'RAC'
+    WL = 'WL'
+    CAN = 'CAN'
+    UNKNOWN = 'UNKNOWN'
+
+    @classmethod
+    def of(cls, text):
+        return cls(status_category(text))
+
+
+# Classes declare __slots__ themselves (dataclass(slots=True) needs Python 3.10);
+# fields therefore have no defaults
+
+@dataclass(frozen=True)
+class Passenger:
+    __slots__ = ('passenger_no', 'booking_status', 'current_status', 'coach_position', 'status', 'position')
+    passenger_no: str
+    booking_status: str
+    current_status: str
+    coach_position: str
+    status: Status
+    position: Optional[int]   # WL/RAC position, None for other statuses
+
+    @classmethod
+    def parse(cls, passenger_no, booking_status, current_status, coach_position=''):
+        """Build a Passenger from the status texts, parsing the status code and position"""
+        return cls(passenger_no or '', booking_status or '', current_status or '', coach_position or '',
+                   Status.of(current_status), status_position(current_status))
+
+    @classmethod
+    def from_dict(cls, passenger):
+        return cls.parse(passenger.get('passenger_no'), passenger.get('booking_status'),
+                         passenger.get('current_status'), passenger.get('coach_position'))
+
+    def to_dict(self):
+        return {
+            'passenger_no': self.passenger_no,
+            'booking_status': self.booking_status,
+            'current_status': self.current_status,
+            'coach_position': self.coach_position,
+        }
+
+    def to_row(self):
+        """The status texts as a list; the parsed fields are derived again on load"""
+        return [self.passenger_no, self.booking_status, self.current_status, self.coach_position]
+
+    @classmethod
+    def from_row(cls, row):
+        return cls.parse(*row)
+
+
+@dataclass(frozen=True)
+class Journey:
+    __slots__ = ('train_number', 'train_name', 'boarding_date_text', 'from_station', 'to_station',
+                 'reserved_upto', 'boarding_point', 'travel_class', 'boarding_date')
+    train_number: str
+    train_name: str
+    boarding_date_text: str   # as shown by the site, e.g. '5-11-2025'
+    from_station: str
+    to_station: str
+    reserved_upto: str
+    boarding_point: str
+    travel_class: str
+    boarding_date: Optional[date]   # None if the text is not a known format
+
+    @classmethod
+    def parse(cls, *texts):
+        """Build a Journey from the texts of JOURNEY_FIELDS, in that order"""
+        texts = [text or '' for text in texts] + [''] * (len(JOURNEY_FIELDS) - len(texts))
+        return cls(*texts[:len(JOURNEY_FIELDS)], parse_boarding_date(texts[2]))
+
+    @classmethod
+    def from_dict(cls, journey):
+        return cls.parse(*(journey.get(field) for field in JOURNEY_FIELDS))
+
+    def to_row(self):
+        return [self.train_number, self.train_name, self.boarding_date_text, self.from_station,
+                self.to_station, self.reserved_upto, self.boarding_point, self.travel_class]
+
+    @classmethod
+    def from_row(cls, row):
+        return cls.parse(*row)
+
+    def to_dict(self):
+        return dict(zip(JOURNEY_FIELDS, self.to_row()))
+
+    def days_until(self, today=None):
+        """Days from today to the boarding date, None if the date is unknown"""
+        if self.boarding_date is None:
+            return None
+        return (self.boarding_date - (today or date.today())).days
+
+
+@dataclass(frozen=True)
+class PnrResult:
+    __slots__ = ('pnr_number', 'journey', 'passengers', 'checked_at')
+    pnr_number: str
+    journey: Journey
+    passengers: Tuple[Passenger, ...]
+    checked_at: Optional[float]     # time.time() value, None if unknown
+
+    @classmethod
+    def from_dict(cls, pnr_number, result, checked_at=None):
+        """Build from a check_pnr result ({'journey_details', 'passenger_details'})"""
+        return cls(
+            pnr_number,
+            Journey.from_dict(result.get('journey_details') or {}),
+            tuple(Passenger.from_dict(p) for p in result.get('passenger_details') or []),
+            checked_at,
+        )
+
+    def to_dict(self):
+        """The check_pnr result shape, for emails and other dict consumers"""
+        return {
+            'journey_details': self.journey.to_dict(),
+            'passenger_details': [p.to_dict() for p in self.passengers],
+        }
+
+    @property
+    def statuses(self):
+        return tuple(p.status for p in self.passengers)
+
+    def to_json(self):
+        """Compact positional JSON: [pnr, checked_at, journey row, [passenger rows]]"""
+        return json.dumps(
+            [self.pnr_number, self.checked_at, self.journey.to_row(), [p.to_row() for p in self.passengers]],
+            ensure_ascii=False, separators=(',', ':')
+        )
+
+    @classmethod
+    def from_json(cls, text):
+        pnr_number, checked_at, journey, passengers = json.loads(text)
+        return cls(pnr_number, Journey.from_row(journey),
+                   tuple(Passenger.from_row(row) for row in passengers), checked_at)
+
+    def to_bytes(self):
+        return self.to_json().encode('utf-8')
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls.from_json(bytes(data).decode('utf-8'))
@@ -0,0 +1,210 @@
+"""
+PNR Result Parsing
+Turns enquiry responses (HTML tables or JSON) into the journey_details and
+passenger_details dicts used throughout the checker
+"""
+
+import re
+from datetime import datetime
+from html.parser import HTMLParser
+
+
+JOURNEY_FIELDS = [
+    'train_number',
+    'train_name',
+    'boarding_date',
+    'from',
+    'to',
+    'reserved_upto',
+    'boarding_point',
+    'class',
+]
+
+
+BOARDING_DATE_FORMATS = (
+    '%d-%m-%Y',
+    '%d-%b-%Y',
+    '%d/%m/%Y',
+    '%Y-%m-%d',
+    '%b %d, %Y',
+    '%a %b %d %Y',
+)
+
+
+def parse_boarding_date(text):
+    """Parse a boarding date such as '5-11-2025' into a date, or None"""
+    text = ' '.join((text or '').split())
+    for fmt in BOARDING_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def status_category(status):
+    """Classify a booking/current status string as CNF, RAC, WL, CAN or UNKNOWN"""
+    status = (status or '').upper()
+    if 'CAN' in status:
+        return 'CAN'
+    if 'CNF' in status or 'CONFIRMED' in status:
+        return 'CNF'
+    if 'RAC' in status:
+        return 'RAC'
+    if 'WL' in status:
+        return 'WL'
+    # A bare coach/berth such as 'B2 34' is a confirmed seat
+    if any(char.isdigit() for char in status):
+        return 'CNF'
+    return 'UNKNOWN'
+
+
+_POSITION_PATTERN = re.compile(r'(?:WL|RAC)\s*/?\s*(\d+)', re.IGNORECASE)
+
+
+def status_position(status):
+    """Return the WL/RAC position in a status such as 'WL/12' or 'RLWL/5', or None"""
+    match = _POSITION_PATTERN.search(status or '')
+    return int(match.group(1)) if match else None
+
+
+def journey_from_cells(cells):
+    """Map the cell texts of the journey table data row to journey_details"""
+    cells = list(cells) + [''] * (len(JOURNEY_FIELDS) - len(cells))
+    return {field: cells[i] for i, field in enumerate(JOURNEY_FIELDS)}
+
+
+def passenger_from_cells(cells):
+    """Map the cell texts of one passenger table row to a passenger dict"""
+    cells = list(cells) + [''] * (4 - len(cells))
+    return {
+        'passenger_no': cells[0],
+        'booking_status': cells[1],
+        'current_status': cells[2],
+        'coach_position': cells[3],
+    }
+
+
+def passengers_from_rows(rows):
+    """Map passenger table rows to passenger_details, skipping empty rows"""
+    return [passenger_from_cells(cells) for cells in rows if any(cells)]
+
+
+class _TableExtractor(HTMLParser):
+    """Collect the text of every <td> in the <tbody> rows of tables by id"""
+
+    def __init__(self, table_ids):
+        super().__init__(convert_charrefs=True)
+        self.table_ids = set(table_ids)
+        self.tables = {}
+        self._table = None
+        self._depth = 0
+        self._in_body = False
+        self._row = None
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'table':
+            if self._table:
+                self._depth += 1
+            else:
+                table_id = dict(attrs).get('id')
+                if table_id in self.table_ids:
+                    self._table = table_id
+                    self._depth = 0
+                    self.tables[table_id] = []
+            return
+        if not self._table or self._depth:
+            return
+        if tag == 'tbody':
+            self._in_body = True
+        elif tag == 'tr' and self._in_body:
+            self._row = []
+        elif tag in ('td', 'th') and self._row is not None:
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if not self._table:
+            return
+        if tag == 'table':
+            if self._depth:
+                self._depth -= 1
+            else:
+                self._table = None
+                self._in_body = False
+            return
+        if self._depth:
+            return
+        if tag in ('td', 'th') and self._cell is not None:
+            self._row.append(' '.join(''.join(self._cell).split()))
+            self._cell = None
+        elif tag == 'tr' and self._row is not None:
+            self.tables[self._table].append(self._row)
+            self._row = None
+        elif tag == 'tbody':
+            self._in_body = False
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def extract_table_rows(html, table_ids=('journeyDetailsTable', 'psgnDetailsTable')):
+    """Return {table_id: [[cell text, ...], ...]} for the tbody rows of each table"""
+    extractor = _TableExtractor(table_ids)
+    extractor.feed(html)
+    extractor.close()
+    return extractor.tables
+
+
+def parse_result_html(html):
+    """
+    Parse the result tables out of an enquiry page
+    Returns {'journey_details', 'passenger_details'} or None if not present
+    """
+    tables = extract_table_rows(html)
+    journey_rows = tables.get('journeyDetailsTable')
+    passenger_rows = tables.get('psgnDetailsTable')
+    if not journey_rows or not passenger_rows:
+        return None
+    return {
+        'journey_details': journey_from_cells(journey_rows[0]),
+        'passenger_details': passengers_from_rows(passenger_rows),
+    }
+
+
+def parse_result_json(data):
+    """
+    Parse the JSON returned by the enquiry endpoint
+    Returns {'journey_details', 'passenger_details'} or None if not present
+    """
+    if not isinstance(data, dict) or not data.get('trainNumber'):
+        return None
+
+    journey_details = {
+        'train_number': str(data.get('trainNumber', '')),
+        'train_name': data.get('trainName', ''),
+        'boarding_date': data.get('dateOfJourney', ''),
+        'from': data.get('sourceStation', ''),
+        'to': data.get('destinationStation', ''),
+        'reserved_upto': data.get('reservationUpto', ''),
+        'boarding_point': data.get('boardingPoint', ''),
+        'class': data.get('journeyClass', ''),
+    }
+
+    passenger_details = []
+    for index, passenger in enumerate(data.get('passengerList') or [], start=1):
+        serial = passenger.get('passengerSerialNumber', index)
+        coach = passenger.get('currentCoachId') or ''
+        berth = passenger.get('currentBerthNo') or ''
+        passenger_details.append({
+            'passenger_no': f"Passenger {serial}",
+            'booking_status': passenger.get('bookingStatusDetails', ''),
+            'current_status': passenger.get('currentStatusDetails', ''),
+            'coach_position': f"{coach} {berth}".strip() if berth else coach,
+        })
+
+    return {
+        'journey_details': journey_details,
+        'passenger_details': passenger_details,
+    }
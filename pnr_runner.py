@@ -0,0 +1,124 @@
+"""
+Parallel PNR Runner
+Checks many PNRs at once with bounded concurrency and per-host rate limiting
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from urllib.parse import urlparse
+
+
+class HostRateLimiter:
+    def __init__(self, min_interval=2.0):
+        """Allow at most one request per host every min_interval seconds"""
+        self.min_interval = max(0.0, float(min_interval))
+        self._next_allowed = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        """Block until a request to the host of url is allowed"""
+        if not self.min_interval:
+            return
+        host = urlparse(url).netloc or url
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_allowed.get(host, 0.0))
+            self._next_allowed[host] = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class PNRRunner:
+    def __init__(self, checker_factory, max_concurrency=1):
+        """
+        Initialize the runner
+
+        checker_factory - callable returning a new PNRChecker; each worker
+                          thread gets its own checker because a checker
+                          holds the driver of the check in progress
+        max_concurrency - maximum number of PNRs checked at the same time
+        """
+        self.checker_factory = checker_factory
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._local = threading.local()
+
+    def _checker(self):
+        """Get the PNRChecker owned by the current worker thread"""
+        checker = getattr(self._local, 'checker', None)
+        if checker is None:
+            checker = self.checker_factory()
+            self._local.checker = checker
+        return checker
+
+    def _check_one(self, pnr_number):
+        """Check a single PNR and capture any error instead of raising"""
+        print(f"\n{'='*80}")
+        print(f"Processing PNR: {pnr_number}")
+        print(f"{'='*80}")
+        start = time.perf_counter()
+        try:
+            result = self._checker().check_pnr(pnr_number)
+            return {'pnr_number': pnr_number, 'result': result, 'error': None,
+                    'seconds': time.perf_counter() - start}
+        except Exception as e:
+            print(f"\n❌ Error processing PNR {pnr_number}: {e}")
+            return {'pnr_number': pnr_number, 'result': None, 'error': str(e),
+                    'seconds': time.perf_counter() - start}
+
+    def _check_and_report(self, pnr_number, on_result=None):
+        """Check a PNR and hand the outcome to on_result"""
+        outcome = self._check_one(pnr_number)
+        if on_result:
+            try:
+                on_result(outcome)
+            except Exception as e:
+                print(f"❌ Error handling result of PNR {pnr_number}: {e}")
+        return outcome
+
+    def run(self, pnr_numbers, on_result=None):
+        """
+        Check all PNRs and return one entry per PNR in input order
+
+        Each entry is a dict with 'pnr_number', 'result' (the check_pnr
+        return value or None), 'error' (message or None) and 'seconds'.
+        on_result, if given, is called with each entry as soon as that PNR
+        finishes, from the worker thread that checked it.
+        """
+        def check(pnr_number):
+            return self._check_and_report(pnr_number, on_result)
+
+        pnr_numbers = list(pnr_numbers)
+        if self.max_concurrency == 1 or len(pnr_numbers) <= 1:
+            return [check(pnr) for pnr in pnr_numbers]
+
+        workers = min(self.max_concurrency, len(pnr_numbers))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pnr') as executor:
+            # map() yields in submission order regardless of completion order
+            return list(executor.map(check, pnr_numbers))
+
+    def stream(self, items, on_result=None, key=None, max_pending=None):
+        """
+        Check PNRs from an iterable of any length without reading it all
+
+        Yields (item, outcome) pairs in completion order. key maps an item to
+        its PNR number (default: the item is the PNR number). The iterable is
+        only read as checks finish, so at most max_pending (default twice
+        max_concurrency) items are in flight at any time.
+        """
+        key = key or (lambda item: item)
+        max_pending = max(self.max_concurrency, int(max_pending or 2 * self.max_concurrency))
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='pnr') as executor:
+            pending = {}
+            for item in items:
+                future = executor.submit(self._check_and_report, key(item), on_result)
+                pending[future] = item
+                if len(pending) >= max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield pending.pop(future), future.result()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
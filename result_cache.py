@@ -0,0 +1,130 @@
+"""
+PNR Result Cache
+Persistent sqlite cache of the last result per PNR, with a time-to-live
+that depends on the booking status and how close the journey is
+"""
+
+import json
+import math
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pnr_models import PnrResult, Status
+
+
+# Hours until a cached result is considered stale
+DEFAULT_TTL_HOURS = {
+    'confirmed': 24,               # every passenger CNF or cancelled
+    'waiting_near_departure': 1,   # WL/RAC with departure within near_departure_days
+    'waiting': 6,                  # WL/RAC with departure within distant_days
+    'distant': 24,                 # WL/RAC further out than distant_days
+}
+NEAR_DEPARTURE_DAYS = 1
+DISTANT_DAYS = 7
+
+
+def next_check_interval(result, now=None, ttl_hours=None):
+    """
+    How long (seconds) until a PNR with this result should be checked again
+    Returns None once the journey date has passed - it never needs checking
+    """
+    ttl_hours = dict(DEFAULT_TTL_HOURS, **(ttl_hours or {}))
+    now = now or datetime.now()
+
+    record = PnrResult.from_dict('', result)
+    days_left = record.journey.days_until(now.date())
+    if days_left is not None and days_left < 0:
+        return None
+
+    categories = set(record.statuses)
+    if categories and categories <= {Status.CNF, Status.CAN}:
+        return ttl_hours['confirmed'] * 3600
+
+    if days_left is None or days_left > DISTANT_DAYS:
+        return ttl_hours['distant'] * 3600
+    if days_left <= NEAR_DEPARTURE_DAYS:
+        return ttl_hours['waiting_near_departure'] * 3600
+    return ttl_hours['waiting'] * 3600
+
+
+class ResultCache:
+    def __init__(self, path='pnr_cache.db', ttl_hours=None):
+        """Open (or create) the cache database at path"""
+        self.path = path
+        self.ttl_hours = ttl_hours
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pnr_results (
+                pnr_number   TEXT PRIMARY KEY,
+                journey_date TEXT,
+                status       TEXT,
+                checked_at   REAL NOT NULL,
+                expires_at   REAL,
+                result       TEXT NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, pnr_number, now=None):
+        """Return the cached result if it is still fresh, otherwise None"""
+        now = now or time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at, result FROM pnr_results WHERE pnr_number = ?",
+                (pnr_number,)
+            ).fetchone()
+        if not row:
+            return None
+        expires_at, result = row
+        # expires_at NULL means the journey is over and never needs checking
+        if expires_at is not None and expires_at <= now:
+            return None
+        return json.loads(result)
+
+    def expires_at(self, pnr_number):
+        """
+        When the cached result of a PNR goes stale (a time.time() value)
+        Returns None if nothing is cached and math.inf once the journey is over
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at FROM pnr_results WHERE pnr_number = ?",
+                (pnr_number,)
+            ).fetchone()
+        if not row:
+            return None
+        return math.inf if row[0] is None else row[0]
+
+    def put(self, pnr_number, result, now=None):
+        """Store a successful result with a TTL derived from its status"""
+        now = now or time.time()
+        interval = next_check_interval(result, datetime.fromtimestamp(now), self.ttl_hours)
+        journey = result.get('journey_details') or {}
+        passengers = result.get('passenger_details') or []
+        status = ','.join(p.get('current_status', '') for p in passengers)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pnr_results VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    pnr_number,
+                    journey.get('boarding_date'),
+                    status,
+                    now,
+                    None if interval is None else now + interval,
+                    json.dumps(result, separators=(',', ':')),
+                )
+            )
+            self._conn.commit()
+
+    def invalidate(self, pnr_number):
+        """Forget the cached result for a PNR"""
+        with self._lock:
+            self._conn.execute("DELETE FROM pnr_results WHERE pnr_number = ?", (pnr_number,))
+            self._conn.commit()
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,154 @@
+"""
+PNR Check Scheduler
+Priority queue of PNRs ordered by when each is next due, for running the
+checker as a long-lived daemon. Each PNR's cadence follows its last result
+(next_check_interval): hourly for WL/RAC just before departure, daily for
+distant journeys, never again once the journey is over. Due times are
+jittered so checks do not arrive at the site in bursts.
+"""
+
+import heapq
+import random
+import threading
+import time
+from datetime import datetime
+from result_cache import next_check_interval
+
+
+class CheckScheduler:
+    def __init__(self, ttl_hours=None, jitter=0.1, retry_minutes=15, startup_spread_seconds=60, max_batch=None):
+        """
+        Create an empty schedule
+
+        ttl_hours              - overrides of DEFAULT_TTL_HOURS, as for ResultCache
+        jitter                 - each interval is stretched or shrunk by up to this
+                                 fraction (0.1 = ±10%)
+        retry_minutes          - delay before a failed check is tried again
+        startup_spread_seconds - PNRs due immediately are spread over this window
+        max_batch              - most PNRs handed to the runner at once (None = all due)
+        """
+        self.ttl_hours = ttl_hours
+        self.jitter = jitter
+        self.retry_seconds = retry_minutes * 60
+        self.startup_spread_seconds = startup_spread_seconds
+        self.max_batch = max_batch
+        self._heap = []            # (due_at, sequence, pnr_number)
+        self._due = {}             # pnr_number -> due_at of its live heap entry
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def _jittered(self, seconds):
+        if not self.jitter:
+            return seconds
+        return seconds * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def add(self, pnr_number, due_at=None):
+        """
+        Schedule a PNR at due_at (time.time() value), by default at a random
+        moment within the startup spread. Replaces any earlier schedule.
+        """
+        if due_at is None:
+            due_at = time.time() + random.uniform(0, self.startup_spread_seconds)
+        with self._lock:
+            # Older heap entries of this PNR are skipped when popped
+            self._due[pnr_number] = due_at
+            self._sequence += 1
+            heapq.heappush(self._heap, (due_at, self._sequence, pnr_number))
+
+    def remove(self, pnr_number):
+        """Stop checking a PNR"""
+        with self._lock:
+            self._due.pop(pnr_number, None)
+
+    def reschedule(self, pnr_number, result, now=None):
+        """
+        Schedule the next check from a successful result
+        Returns the new due time, or None if the journey is over and the
+        PNR was dropped from the schedule
+        """
+        now = now or time.time()
+        interval = next_check_interval(result, datetime.fromtimestamp(now), self.ttl_hours)
+        if interval is None:
+            self.remove(pnr_number)
+            return None
+        due_at = now + self._jittered(interval)
+        self.add(pnr_number, due_at)
+        return due_at
+
+    def retry(self, pnr_number, now=None):
+        """Schedule another attempt after a failed check; returns the due time"""
+        due_at = (now or time.time()) + self._jittered(self.retry_seconds)
+        self.add(pnr_number, due_at)
+        return due_at
+
+    def _discard_stale(self):
+        """Drop superseded heap entries from the top of the heap (lock held)"""
+        while self._heap:
+            due_at, _, pnr_number = self._heap[0]
+            if self._due.get(pnr_number) == due_at:
+                return
+            heapq.heappop(self._heap)
+
+    def next_due(self):
+        """Time the earliest PNR is due, or None if nothing is scheduled"""
+        with self._lock:
+            self._discard_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now=None):
+        """Remove and return the PNRs due by now, earliest first"""
+        now = now or time.time()
+        due = []
+        with self._lock:
+            while self.max_batch is None or len(due) < self.max_batch:
+                self._discard_stale()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                _, _, pnr_number = heapq.heappop(self._heap)
+                del self._due[pnr_number]
+                due.append(pnr_number)
+        return due
+
+    def __len__(self):
+        with self._lock:
+            return len(self._due)
+
+    def run(self, runner, on_result=None, stop_event=None, on_batch=None):
+        """
+        Check PNRs as they fall due until none are left or stop_event is set
+
+        runner    - PNRRunner checking each batch of due PNRs
+        on_result - called with each outcome, as for PNRRunner.run
+        on_batch  - called with the list of outcomes after each batch
+        """
+        stop_event = stop_event or threading.Event()
+
+        def handle(outcome):
+            pnr_number = outcome['pnr_number']
+            if outcome['result']:
+                due_at = self.reschedule(pnr_number, outcome['result'])
+                if due_at is None:
+                    print(f"ℹ️ PNR {pnr_number}: journey is over, no more checks")
+                else:
+                    print(f"ℹ️ PNR {pnr_number}: next check at {datetime.fromtimestamp(due_at):%Y-%m-%d %H:%M}")
+            else:
+                due_at = self.retry(pnr_number)
+                print(f"ℹ️ PNR {pnr_number}: check failed, retrying at {datetime.fromtimestamp(due_at):%H:%M}")
+            if on_result:
+                on_result(outcome)
+
+        while not stop_event.is_set():
+            next_due = self.next_due()
+            if next_due is None:
+                print("No PNRs left to check")
+                return
+            wait = next_due - time.time()
+            if wait > 0:
+                print(f"Next check at {datetime.fromtimestamp(next_due):%Y-%m-%d %H:%M:%S} "
+                      f"({len(self)} PNR(s) scheduled)")
+                # Wake up early to notice a stop request or a newly added PNR
+                stop_event.wait(min(wait, 300))
+                continue
+            outcomes = runner.run(self.pop_due(), on_result=handle)
+            if on_batch:
+                on_batch(outcomes)
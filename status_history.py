@@ -0,0 +1,319 @@
+"""
+PNR Status History
+Keeps the last passenger snapshot per PNR and reports what changed since
+then, so notifications go out only on meaningful status transitions
+"""
+
+import json
+import queue
+import sqlite3
+import threading
+import time
+from pnr_models import Passenger, PnrResult, Status
+
+
+_STOP = object()
+
+
+# Every transition type diff_passengers can report
+TRANSITION_TYPES = (
+    'new',              # first time this PNR is seen
+    'confirmed',        # a passenger became CNF
+    'rac',              # a passenger moved from WL to RAC
+    'waitlist_moved',   # WL/RAC position improved, e.g. WL/12 -> WL/5
+    'waitlist_worse',   # WL/RAC position got worse
+    'cancelled',        # a passenger was cancelled
+    'status_changed',   # any other change, e.g. berth allotted after charting
+)
+
+
+def classify_transition(old_status, new_status):
+    """Name the transition between two current_status values, or None if unchanged"""
+    return _classify(Passenger.parse('', '', old_status), Passenger.parse('', '', new_status))
+
+
+def _classify(old, new):
+    """classify_transition on the parsed statuses of two Passengers"""
+    if old.current_status.strip() == new.current_status.strip():
+        return None
+
+    if new.status == Status.CAN and old.status != Status.CAN:
+        return 'cancelled'
+    if new.status == Status.CNF and old.status != Status.CNF:
+        return 'confirmed'
+    if new.status == Status.RAC and old.status == Status.WL:
+        return 'rac'
+    if new.status == old.status and new.status in (Status.WL, Status.RAC):
+        if old.position is not None and new.position is not None:
+            if new.position < old.position:
+                return 'waitlist_moved'
+            if new.position > old.position:
+                return 'waitlist_worse'
+    return 'status_changed'
+
+
+def _passenger(passenger):
+    return passenger if isinstance(passenger, Passenger) else Passenger.from_dict(passenger)
+
+
+def diff_passengers(old_passengers, new_passengers):
+    """
+    Compare two passenger lists (passenger_details dicts or Passengers)
+
+    Returns a list of changes, each a dict with 'type', 'passenger_no',
+    'old' and 'new'. A PNR with no previous snapshot yields one 'new' change.
+    """
+    if old_passengers is None:
+        return [{'type': 'new', 'passenger_no': '', 'old': '', 'new': ''}]
+
+    old_passengers = [_passenger(p) for p in old_passengers]
+    new_passengers = [_passenger(p) for p in new_passengers or []]
+    if old_passengers == new_passengers:
+        return []
+
+    old_by_name = {p.passenger_no: p for p in old_passengers}
+    changes = []
+    for index, passenger in enumerate(new_passengers):
+        previous = old_by_name.get(passenger.passenger_no)
+        if previous is None and index < len(old_passengers):
+            previous = old_passengers[index]
+        old_status = previous.current_status if previous else ''
+        new_status = passenger.current_status
+
+        transition = _classify(previous or Passenger.parse('', '', ''), passenger)
+        if transition is None and previous and previous.coach_position != passenger.coach_position:
+            transition = 'status_changed'
+            old_status = f"{old_status} {previous.coach_position}".strip()
+            new_status = f"{new_status} {passenger.coach_position}".strip()
+
+        if transition:
+            changes.append({
+                'type': transition,
+                'passenger_no': passenger.passenger_no,
+                'old': old_status,
+                'new': new_status,
+            })
+    return changes
+
+
+class StatusHistory:
+    def __init__(self, path='pnr_history.db', batch_size=100, flush_interval=1.0):
+        """
+        Open (or create) the history database at path
+
+        Besides the last snapshot per PNR (for change detection) every
+        snapshot is appended to a time series. Writes are queued and
+        committed by a background thread in batches of up to batch_size,
+        at least every flush_interval seconds, so workers never wait on
+        each other's commits.
+        """
+        self.path = path
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()          # the connection
+        self._pending_lock = threading.Lock()  # _pending
+        self._pending = {}                     # pnr_number -> passengers not yet committed
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # Readers (e.g. the query CLI) do not block the writer in WAL mode
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS last_snapshot (
+                pnr_number TEXT PRIMARY KEY,
+                checked_at REAL NOT NULL,
+                passengers TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                id         INTEGER PRIMARY KEY,
+                pnr_number TEXT NOT NULL,
+                checked_at REAL NOT NULL,
+                changes    TEXT NOT NULL,
+                snapshot   BLOB NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS snapshots_pnr ON snapshots (pnr_number, checked_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS snapshots_time ON snapshots (checked_at)")
+        self._conn.commit()
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._run, name='history-writer', daemon=True)
+        self._writer.start()
+        self.closed = False
+
+    def last_passengers(self, pnr_number):
+        """Return the last recorded Passengers of a PNR, or None"""
+        with self._pending_lock:
+            if pnr_number in self._pending:
+                return self._pending[pnr_number]
+        return self._stored_passengers(pnr_number)
+
+    def _stored_passengers(self, pnr_number):
+        """last_passengers as committed to the database"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT passengers FROM last_snapshot WHERE pnr_number = ?",
+                (pnr_number,)
+            ).fetchone()
+        if not row:
+            return None
+        # Passenger rows; snapshots written before the models were dicts
+        return [Passenger.from_dict(p) if isinstance(p, dict) else Passenger.from_row(p)
+                for p in json.loads(row[0])]
+
+    def last(self, pnr_number):
+        """Return the last recorded passenger_details for a PNR, or None"""
+        passengers = self.last_passengers(pnr_number)
+        return None if passengers is None else [p.to_dict() for p in passengers]
+
+    def record(self, pnr_number, result, now=None):
+        """
+        Queue the new snapshot of a PNR for writing
+        Returns the changes against the previous snapshot (see diff_passengers)
+        """
+        snapshot = PnrResult.from_dict(pnr_number, result, now or time.time())
+        passengers = list(snapshot.passengers)
+        # Diff and replace under one lock so two checks of the same PNR
+        # cannot both diff against the same previous snapshot
+        with self._pending_lock:
+            previous = self._pending.get(pnr_number)
+            if previous is None:
+                previous = self._stored_passengers(pnr_number)
+            changes = diff_passengers(previous, passengers)
+            self._pending[pnr_number] = passengers
+        self._queue.put((snapshot, ','.join(change['type'] for change in changes)))
+        return changes
+
+    def _run(self):
+        """Writer thread: commit queued snapshots in batches"""
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not _STOP:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            if batch[-1] is _STOP:
+                stop = True
+            items = [item for item in batch if item is not _STOP]
+            try:
+                if items:
+                    self._write(items)
+            except Exception as e:
+                print(f"❌ Could not write {len(items)} status snapshot(s): {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, items):
+        """Write one batch of (PnrResult, change types) in a single transaction"""
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO last_snapshot VALUES (?, ?, ?)",
+                    [(snapshot.pnr_number, snapshot.checked_at,
+                      json.dumps([p.to_row() for p in snapshot.passengers], ensure_ascii=False, separators=(',', ':')))
+                     for snapshot, _ in items]
+                )
+                self._conn.executemany(
+                    "INSERT INTO snapshots (pnr_number, checked_at, changes, snapshot) VALUES (?, ?, ?, ?)",
+                    [(snapshot.pnr_number, snapshot.checked_at, changes, snapshot.to_bytes())
+                     for snapshot, changes in items]
+                )
+        # Committed: change detection can read these from the database now
+        with self._pending_lock:
+            for snapshot, _ in items:
+                if self._pending.get(snapshot.pnr_number) == list(snapshot.passengers):
+                    del self._pending[snapshot.pnr_number]
+
+    def flush(self):
+        """Wait until every queued snapshot is written"""
+        self._queue.join()
+
+    def timeline(self, pnr_number, since=None):
+        """Every snapshot (PnrResult) of a PNR since a time.time() value, oldest first"""
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT snapshot FROM snapshots WHERE pnr_number = ? AND checked_at >= ? ORDER BY checked_at",
+                (pnr_number, since or 0)
+            ).fetchall()
+        return [PnrResult.from_bytes(row[0]) for row in rows]
+
+    def positions(self, pnr_number, since=None):
+        """
+        Status of each passenger of a PNR over time, oldest first
+        Returns dicts with 'checked_at', 'passenger_no', 'current_status',
+        'status' (a Status) and 'position' (WL/RAC position or None)
+        """
+        return [
+            {
+                'checked_at': snapshot.checked_at,
+                'passenger_no': passenger.passenger_no,
+                'current_status': passenger.current_status,
+                'status': passenger.status,
+                'position': passenger.position,
+            }
+            for snapshot in self.timeline(pnr_number, since)
+            for passenger in snapshot.passengers
+        ]
+
+    def changed_since(self, since):
+        """
+        PNRs whose status changed (first checks aside) at or after since
+        Returns dicts with 'pnr_number', 'last_change' and 'changes' (the
+        transition types seen), most recent change first
+        """
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT pnr_number, checked_at, changes FROM snapshots "
+                "WHERE checked_at >= ? AND changes != '' AND changes != 'new' ORDER BY checked_at DESC",
+                (since,)
+            ).fetchall()
+        changed = {}
+        for pnr_number, checked_at, changes in rows:
+            entry = changed.setdefault(pnr_number, {'pnr_number': pnr_number, 'last_change': checked_at, 'changes': []})
+            for change in changes.split(','):
+                if change not in entry['changes']:
+                    entry['changes'].append(change)
+        return list(changed.values())
+
+    def close(self):
+        """Write everything still queued and close the database connection"""
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.put(_STOP)
+        self._writer.join()
+        with self._lock:
+            self._conn.close()
+
+
+if __name__ == "__main__":
+    import sys
+    from datetime import datetime
+
+    usage = ("Usage: python status_history.py positions <pnr> [db]\n"
+             "       python status_history.py changed [hours] [db]")
+    if len(sys.argv) < 2 or sys.argv[1] not in ('positions', 'changed'):
+        print(usage)
+        sys.exit(1)
+
+    if sys.argv[1] == 'positions':
+        if len(sys.argv) < 3:
+            print(usage)
+            sys.exit(1)
+        history = StatusHistory(sys.argv[3] if len(sys.argv) > 3 else 'pnr_history.db')
+        for entry in history.positions(sys.argv[2]):
+            position = '' if entry['position'] is None else entry['position']
+            print(f"{datetime.fromtimestamp(entry['checked_at']):%Y-%m-%d %H:%M}  {entry['passenger_no']:<14}"
+                  f"{entry['current_status']:<16}{position}")
+    else:
+        hours = float(sys.argv[2]) if len(sys.argv) > 2 else 24
+        history = StatusHistory(sys.argv[3] if len(sys.argv) > 3 else 'pnr_history.db')
+        for entry in history.changed_since(time.time() - hours * 3600):
+            print(f"{entry['pnr_number']}  {datetime.fromtimestamp(entry['last_change']):%Y-%m-%d %H:%M}  "
+                  f"{', '.join(entry['changes'])}")
+    history.close()